@@ -0,0 +1,222 @@
+"""Benchmarks TensorFlow threading and batch sizes for the agents and writes a tuned profile.
+
+TensorFlow's thread pools can only be configured before the runtime starts,
+so every candidate setting is measured in a fresh subprocess. Run from the
+RL directory:
+
+    python Autotuner.py --threads 1,2,4,8 --batch-sizes 8,16,32,64
+
+Each setting is measured on the GPU (when there is one) and on the CPU;
+the profile records the device of the winning measurement.
+
+The agents call apply_profile() when they are constructed; without a
+profile file TensorFlow's defaults are kept (with GPU memory growth on).
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import itertools
+import subprocess
+
+log = logging.getLogger("rl")
+
+DEFAULT_PROFILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tuned_profile.json")
+
+_applied_profile = None
+
+
+def load_profile(path=DEFAULT_PROFILE_PATH):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def apply_profile(path=DEFAULT_PROFILE_PATH):
+    """Configure TensorFlow from a tuned profile once per process and return the profile.
+
+    Thread settings are ignored (with a warning) if the TensorFlow runtime
+    has already started; later calls return the profile applied first.
+    """
+    global _applied_profile
+    if _applied_profile is not None:
+        return _applied_profile
+
+    import tensorflow as tf
+    profile = load_profile(path)
+
+    gpus = tf.config.list_physical_devices("GPU")
+    if profile.get("device") == "cpu" and gpus:
+        tf.config.set_visible_devices([], "GPU")
+        gpus = []
+    try:
+        for gpu in gpus:
+            tf.config.experimental.set_memory_growth(gpu, profile.get("memory_growth", True))
+        if profile.get("intra_op_threads"):
+            tf.config.threading.set_intra_op_parallelism_threads(profile["intra_op_threads"])
+        if profile.get("inter_op_threads"):
+            tf.config.threading.set_inter_op_parallelism_threads(profile["inter_op_threads"])
+    except RuntimeError as e:
+        log.warning("Could not apply tuned profile, TensorFlow already initialized: %s", e)
+
+    log.info("Using %s (%s)", 'GPU' if gpus else 'CPU', profile or 'default settings')
+    _applied_profile = profile
+    return profile
+
+
+def _build_agent(model_name):
+    if model_name == "cv":
+        from CVModel import CVModel
+        agent = CVModel(profile=None)
+        inputs = lambda batch: _random_images(agent, batch)
+    else:
+        from MultiModalModel import MultiModalModel
+        import numpy as np
+        agent = MultiModalModel(profile=None)
+        inputs = lambda batch: [
+            _random_images(agent, batch),
+            np.random.randint(1, agent.vocab_size, size=(batch, agent.max_text_length))
+        ]
+    return agent, inputs
+
+
+def _random_images(agent, batch):
+    import numpy as np
+    return np.random.randint(0, 256, size=(batch,) + tuple(agent.img_shape)).astype(agent.model.inputs[0].dtype.name)
+
+
+def _time(fn, repeats):
+    fn()  # Warm up (graph tracing, allocations)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def run_worker(model_name, intra, inter, batch_sizes, repeats, device="gpu"):
+    """Measure one thread setting on `device` (in this fresh process) and return the results"""
+    import tensorflow as tf
+    gpus = tf.config.list_physical_devices("GPU")
+    if device == "gpu" and not gpus:
+        raise RuntimeError("no GPU available")
+    if device == "cpu" and gpus:
+        tf.config.set_visible_devices([], "GPU")
+    tf.config.threading.set_intra_op_parallelism_threads(intra)
+    tf.config.threading.set_inter_op_parallelism_threads(inter)
+
+    agent, inputs = _build_agent(model_name)
+    model = agent.model
+    single = inputs(1)
+    act_s = _time(lambda: model(single, training=False), repeats)
+
+    batches = {}
+    for batch in batch_sizes:
+        x = inputs(batch)
+        y = model(x, training=False).numpy()
+        train_s = _time(lambda: model.train_on_batch(x, y), repeats)
+        batches[batch] = {"train_s": train_s, "samples_per_s": batch / train_s}
+    return {"model": model_name, "device": device, "intra_op_threads": intra, "inter_op_threads": inter,
+            "act_ms": act_s * 1000.0, "batches": batches}
+
+
+def measure(model_name, intra, inter, batch_sizes, repeats, device="gpu", timeout=600):
+    """Run run_worker in a subprocess so the thread and device settings take effect"""
+    command = [sys.executable, os.path.abspath(__file__), "--worker", model_name, "--devices", device,
+               "--threads", str(intra), "--inter-threads", str(inter),
+               "--batch-sizes", ",".join(map(str, batch_sizes)), "--repeats", str(repeats)]
+    result = subprocess.run(command, capture_output=True, text=True, timeout=timeout,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        print(f"  {model_name} {device} intra={intra} inter={inter} failed:\n{result.stderr[-2000:]}")
+        return None
+    # The result is the last line; TensorFlow logs may precede it
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def choose_profile(results, act_weight=0.5):
+    """Pick the setting with the best combined train throughput and act latency.
+
+    Each measured setting is scored relative to the best seen for training
+    samples/s (at its best batch size) and for single-frame act latency.
+    """
+    best_train = max(max(b["samples_per_s"] for b in r["batches"].values()) for r in results)
+    best_act = min(r["act_ms"] for r in results)
+
+    def score(r):
+        train = max(b["samples_per_s"] for b in r["batches"].values()) / best_train
+        act = best_act / r["act_ms"]
+        return (1 - act_weight) * train + act_weight * act
+
+    best = max(results, key=score)
+    batch_size = max(best["batches"].items(), key=lambda item: item[1]["samples_per_s"])[0]
+    return {
+        "device": best["device"],
+        "intra_op_threads": best["intra_op_threads"],
+        "inter_op_threads": best["inter_op_threads"],
+        "batch_size": int(batch_size),
+        "act_ms": best["act_ms"],
+        "samples_per_s": best["batches"][batch_size]["samples_per_s"],
+    }
+
+
+def _int_list(text):
+    return [int(value) for value in text.split(",") if value]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune TensorFlow threads and batch size for the RL agents")
+    parser.add_argument("--models", default="cv,multimodal", help="comma separated: cv, multimodal")
+    parser.add_argument("--threads", default=",".join(str(n) for n in (1, 2, 4, os.cpu_count() or 1)),
+                        help="intra-op thread counts to try")
+    parser.add_argument("--inter-threads", default="1,2", help="inter-op thread counts to try")
+    parser.add_argument("--devices", default="gpu,cpu", help="comma separated devices to measure: gpu, cpu")
+    parser.add_argument("--batch-sizes", default="8,16,32,64")
+    parser.add_argument("--repeats", type=int, default=5, help="timed repetitions per measurement")
+    parser.add_argument("--act-weight", type=float, default=0.5, help="weight of act latency vs train throughput")
+    parser.add_argument("--output", default=DEFAULT_PROFILE_PATH, help="where to write the tuned profile")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    batch_sizes = _int_list(args.batch_sizes)
+    if args.worker:
+        result = run_worker(args.worker, _int_list(args.threads)[0], _int_list(args.inter_threads)[0],
+                            batch_sizes, args.repeats, device=args.devices.split(",")[0])
+        print(json.dumps(result))
+        return 0
+
+    profile = {"models": {}}
+    failed = []
+    devices = [device for device in args.devices.split(",") if device]
+    settings = list(itertools.product(devices, sorted(set(_int_list(args.threads))), sorted(set(_int_list(args.inter_threads)))))
+    for model_name in [name for name in args.models.split(",") if name]:
+        results = []
+        for device, intra, inter in settings:
+            result = measure(model_name, intra, inter, batch_sizes, args.repeats, device=device)
+            if result is None:
+                continue
+            best = max(b["samples_per_s"] for b in result["batches"].values())
+            print(f"{model_name} {device} intra={intra} inter={inter}: act {result['act_ms']:.1f}ms, train {best:.1f} samples/s")
+            results.append(result)
+        if results:
+            profile["models"][model_name] = choose_profile(results, args.act_weight)
+        else:
+            failed.append(model_name)
+
+    if failed:
+        print(f"No measurements succeeded for {', '.join(failed)}, profile not written")
+        return 1
+
+    # Process-wide settings come from the first model; batch sizes are per model
+    first = next(iter(profile["models"].values()))
+    profile.update({key: first[key] for key in ("device", "intra_op_threads", "inter_op_threads", "batch_size")})
+    with open(args.output, "w") as f:
+        json.dump(profile, f, indent=2)
+    print(f"Wrote tuned profile to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
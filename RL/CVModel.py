@@ -1,18 +1,21 @@
 import tensorflow as tf
 import numpy as np
 import random
-from tensorflow.keras.layers import Input, Conv2D, GlobalAveragePooling2D, Dense
+import logging
+from tensorflow.keras.layers import Input, Rescaling, Conv2D, GlobalAveragePooling2D, Dense
 from tensorflow.keras.models import Model
+from LearningTargets import DoubleDQNTargets
+from Inference import CompiledPolicy
+from Autotuner import apply_profile, DEFAULT_PROFILE_PATH
 
-physical_devices = tf.config.list_physical_devices('GPU')
-if physical_devices:
-    tf.config.experimental.set_memory_growth(physical_devices[0], True)
-    print("Using GPU for training!")
-else:
-    print("GPU is not available. Using CPU.")
+log = logging.getLogger("rl")
 
 class CVModel:
-    def __init__(self, img_shape=(224, 224, 3), action_space=3, screen_width=1920, screen_height=1080):
+    def __init__(self, img_shape=(84, 84, 1), action_space=3, screen_width=1920, screen_height=1080,
+                 double_dqn=False, n_step=1, target_update_interval=100, profile=DEFAULT_PROFILE_PATH):
+        # Device and thread settings from the autotuner (python Autotuner.py), None to leave TensorFlow as is
+        tuned = apply_profile(profile) if profile else {}
+        self.batch_size = tuned.get("models", {}).get("cv", tuned).get("batch_size", 32)
         self.screen_width = screen_width
         self.screen_height = screen_height
         self.img_shape = img_shape
@@ -26,17 +29,35 @@ class CVModel:
                     self.actions.append((x, y, click))
 
         self.action_space = len(self.actions)  # Number of possible actions
+        self.action_index = {action: i for i, action in enumerate(self.actions)}
         self.learning_rate = 0.001
         self.model = self._build_model()
+        self.policy = CompiledPolicy(self.model)  # Greedy action index for one frame
+        # Greedy action of the last frame key passed to act(), valid until the weights change
+        self._greedy_key = None
+        self._greedy_index = None
+        self.greedy_reuses = 0
         self.memory = []  # Experience replay memory
         self.gamma = 0.95  # Discount factor
         self.epsilon = 1.0  # Exploration rate
         self.epsilon_min = 0.01
         self.epsilon_decay = 0.995
 
+        # Optional n-step Double DQN targets, computed for the whole minibatch at once
+        self.targets = None
+        if double_dqn or n_step > 1:
+            self.targets = DoubleDQNTargets(
+                self.model,
+                n_step=n_step,
+                gamma=self.gamma,
+                target_update_interval=target_update_interval
+            )
+
     def _build_model(self):
-        image_input = Input(shape=self.img_shape, name="image_input")
-        x = Conv2D(32, (3, 3), activation='relu')(image_input)
+        # Observations arrive as uint8; scaling to [0, 1] happens in the graph
+        image_input = Input(shape=self.img_shape, dtype="uint8", name="image_input")
+        x = Rescaling(1.0 / 255.0)(image_input)
+        x = Conv2D(32, (3, 3), activation='relu')(x)
         x = GlobalAveragePooling2D()(x)
         x = Dense(128, activation='relu')(x)
 
@@ -48,29 +69,51 @@ class CVModel:
 
         return model
 
-    def remember(self, state, action, reward, next_state, done):
-        self.memory.append((state, action, reward, next_state, done))
+    def remember(self, state, action, reward, next_state, done, truncated=False):
+        """Store a transition; `truncated` marks an episode cut off by a time limit rather than a terminal state"""
+        self.memory.append((state, action, reward, next_state, done, truncated))
         if len(self.memory) > 2000:
             self.memory.pop(0)
 
-    def act(self, image):
+    def act(self, image, frame_key=None):
+        """Epsilon-greedy action for one observation.
+
+        `frame_key` identifies the screen the observation came from (see
+        PerceptionCache); the greedy action for a key is computed once and
+        reused until the model is trained again.
+        """
         if np.random.rand() <= self.epsilon:
             # Random action: choose a random action from the discrete action space
             return random.choice(self.actions)
 
-        # Predict Q-values for all actions and return the action with the highest Q-value
-        q_values = self.model.predict(np.expand_dims(image, axis=0))[0]
-        best_action_index = np.argmax(q_values)
+        if frame_key is not None and frame_key == self._greedy_key:
+            self.greedy_reuses += 1
+            return self.actions[self._greedy_index]
+
+        # Action with the highest Q-value, chosen inside the compiled forward pass
+        best_action_index = self.policy(image)
+        self._greedy_key = frame_key
+        self._greedy_index = best_action_index
         return self.actions[best_action_index]
 
-    def replay(self, batch_size=32):
+    def act_latency(self):
+        """Percentiles (ms) of the model's decision time in act()"""
+        return self.policy.latency_percentiles()
+
+    def replay(self, batch_size=None):
+        batch_size = batch_size or self.batch_size
         if len(self.memory) < batch_size:
             return
+        self._greedy_key = None  # Training changes the Q-values
+
+        if self.targets is not None:
+            self._replay_batched(batch_size)
+            return
 
         minibatch = random.sample(self.memory, batch_size)
-        for state, action, reward, next_state, done in minibatch:
+        for state, action, reward, next_state, done, _ in minibatch:
             # Get the index of the action
-            action_index = self.actions.index(action)
+            action_index = self.action_index[action]
 
             # Predict the current Q-values for the state
             target = self.model.predict(np.expand_dims(state, axis=0))[0]
@@ -90,3 +133,38 @@ class CVModel:
         if self.epsilon > self.epsilon_min:
             self.epsilon *= self.epsilon_decay
 
+    def _replay_batched(self, batch_size):
+        # n-step returns need the transitions that follow each sample, so sample positions
+        indices = random.sample(range(len(self.memory)), batch_size)
+        states, targets = self.targets.compute(self.memory, indices, self.action_index)
+        self.model.train_on_batch(states, targets)
+        self.targets.step()
+
+        if self.epsilon > self.epsilon_min:
+            self.epsilon *= self.epsilon_decay
+
+    def train_offline(self, dataset, steps=None, log_every=100):
+        """Train on batches of recorded (states, actions, rewards, next_states, dones).
+
+        Runs Double DQN one-step updates (see EpisodeRecorder.transition_dataset)
+        until the dataset is exhausted or `steps` batches have been used.
+        Returns the number of batches trained on. Without configured targets,
+        one-step targets are created here and kept on self.targets, so the
+        target network carries over to later calls and to replay().
+        """
+        if self.targets is None:
+            self.targets = DoubleDQNTargets(self.model, n_step=1, gamma=self.gamma)
+        targets = self.targets
+        self._greedy_key = None
+        trained = 0
+        for states, actions, rewards, next_states, dones in dataset:
+            if steps is not None and trained >= steps:
+                break
+            discounts = self.gamma * (1.0 - dones.numpy())
+            batch_targets = targets.targets_for(states, actions.numpy(), rewards.numpy(), next_states, discounts)
+            loss = self.model.train_on_batch(states, batch_targets)
+            targets.step()
+            trained += 1
+            if log_every and trained % log_every == 0:
+                log.info("Offline step %s: loss=%.5f", trained, loss)
+        return trained
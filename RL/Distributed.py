@@ -0,0 +1,518 @@
+"""Ape-X style distributed data collection for CVModel.
+
+Actor processes run an environment and act() with their own exploration
+rate, and stream finished episodes to one learner over TCP. The learner
+owns the replay memory, trains, and publishes weights that actors pull
+periodically. Run from the RL directory:
+
+    python Distributed.py learner --port 5555
+    python Distributed.py actor --host learner-host --port 5555 --actor-id 0 --num-actors 4
+    python Distributed.py local --actors 3      # learner plus 3 actor processes on this machine
+
+Messages are a 5 byte header (kind, payload length) followed by a
+zlib-compressed payload: JSON for control messages and .npz archives for
+arrays, so nothing is unpickled from the network. Each episode is
+acknowledged once it is in the learner's ingest queue. A full queue delays
+the acknowledgement, an actor has one unacknowledged episode at a time,
+and its local outbox is bounded, so a slow learner throttles the actors.
+Actors reconnect with exponential backoff and resend the unacknowledged
+episode.
+"""
+import io
+import os
+import sys
+import json
+import time
+import logging
+import zlib
+import queue
+import random
+import socket
+import struct
+import argparse
+import threading
+import subprocess
+import socketserver
+import numpy as np
+
+# Run from the RL directory; make the project's Utils package importable too
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Utils.log import setup_logging
+
+log = logging.getLogger("rl")
+
+HEADER = struct.Struct("!BI")
+MAX_MESSAGE_BYTES = 512 * 1024 * 1024
+
+# Message kinds
+HELLO = 1         # actor -> learner, JSON {"actor_id"}
+EPISODE = 2       # actor -> learner, arrays of one episode
+ACK = 3           # learner -> actor, JSON {"accepted"}
+GET_WEIGHTS = 4   # actor -> learner, JSON {"version"}
+WEIGHTS = 5       # learner -> actor, length-prefixed JSON {"version"} then arrays w0..wN
+NOT_MODIFIED = 6  # learner -> actor, weights are already current
+
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def send_message(sock, kind, payload=b"", level=1):
+    send_compressed(sock, kind, zlib.compress(payload, level))
+
+
+def send_compressed(sock, kind, compressed):
+    """Send a payload that was already zlib-compressed (e.g. once for many receivers)"""
+    sock.sendall(HEADER.pack(kind, len(compressed)) + compressed)
+
+
+def recv_message(sock):
+    kind, size = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    if size > MAX_MESSAGE_BYTES:
+        raise ConnectionError(f"message of {size} bytes exceeds limit")
+    return kind, zlib.decompress(_recv_exact(sock, size))
+
+
+def encode_json(obj):
+    return json.dumps(obj).encode()
+
+
+def decode_json(payload):
+    return json.loads(payload.decode())
+
+
+def encode_arrays(arrays):
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def decode_arrays(payload):
+    with np.load(io.BytesIO(payload), allow_pickle=False) as archive:
+        return {name: archive[name] for name in archive.files}
+
+
+def actor_epsilon(actor_id, num_actors, base=0.4, alpha=7.0):
+    """Ape-X per-actor exploration: spread from `base` down to base**(1 + alpha)"""
+    if num_actors <= 1:
+        return base
+    return base ** (1.0 + alpha * actor_id / (num_actors - 1))
+
+
+class SimulatedButtonEnv:
+    """Headless stand-in for PseudoScreen: three buttons drawn into a frame.
+
+    Used where actors can't drive a real screen (several processes on one
+    box, servers without a display). Clicking the green button pays 1, red
+    or blue 0 and anything else -1, as in PseudoScreen; buttons move after
+    every hit.
+    """
+    COLORS = {"Red": (0, 0, 255), "Green": (0, 255, 0), "Blue": (255, 0, 0)}  # BGR
+    REWARDS = {"Red": 0, "Green": 1, "Blue": 0}
+
+    def __init__(self, img_shape, screen_width=1920, screen_height=1080, seed=None):
+        self.img_shape = img_shape
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.random = random.Random(seed)
+        self.buttons = {}
+        self._randomize()
+
+    def _randomize(self):
+        self.buttons = {
+            color: (self.random.randint(0, self.screen_width - 100), self.random.randint(0, self.screen_height - 40))
+            for color in self.COLORS
+        }
+
+    def observe(self):
+        height, width, channels = self.img_shape
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        sx, sy = width / self.screen_width, height / self.screen_height
+        for color, (x, y) in self.buttons.items():
+            frame[int(y * sy):max(int((y + 40) * sy), int(y * sy) + 1),
+                  int(x * sx):max(int((x + 100) * sx), int(x * sx) + 1)] = self.COLORS[color]
+        if channels == 1:
+            # Same weights as cv2's BGR to grayscale conversion
+            frame = (frame @ np.array([0.114, 0.587, 0.299]))[:, :, None].astype(np.uint8)
+        return frame
+
+    def reset(self):
+        self._randomize()
+        return self.observe()
+
+    def step(self, action):
+        x, y, click = action
+        reward = -1
+        if click:
+            for color, (bx, by) in self.buttons.items():
+                if bx <= x < bx + 100 and by <= y < by + 40:
+                    reward = self.REWARDS[color]
+                    self._randomize()
+                    break
+        return self.observe(), reward
+
+
+class LearnerServer:
+    """Accepts actor connections, queues their episodes and serves weights"""
+
+    def __init__(self, host="0.0.0.0", port=5555, queue_size=64, compress_level=1):
+        self.ingest = queue.Queue(maxsize=queue_size)
+        self.compress_level = compress_level
+        self.stats = {}  # actor id -> {"episodes", "steps", "connections"}
+        self._stats_lock = threading.Lock()
+        self._weights = None
+        self._weights_version = 0
+        self._weights_lock = threading.Lock()
+        self._stop = threading.Event()
+
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                server._serve(self.request)
+
+        class Server(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        self._server = Server((host, port), Handler)
+        self.address = self._server.server_address
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="learner-server", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def publish_weights(self, weights):
+        """Make new weights available to actors (serialized and compressed once, here)"""
+        arrays = encode_arrays({f"w{i}": w for i, w in enumerate(weights)})
+        with self._weights_lock:
+            version = self._weights_version + 1
+            header = encode_json({"version": version})
+            self._weights = zlib.compress(struct.pack("!I", len(header)) + header + arrays, self.compress_level)
+            self._weights_version = version
+
+    def _serve(self, sock):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        actor_id = None
+        try:
+            while not self._stop.is_set():
+                kind, payload = recv_message(sock)
+                if kind == HELLO:
+                    actor_id = decode_json(payload)["actor_id"]
+                    self._count(actor_id, connections=1)
+                elif kind == EPISODE:
+                    episode = decode_arrays(payload)
+                    # Blocks while the learner is behind; the missing ACK holds the actor back
+                    while not self._stop.is_set():
+                        try:
+                            self.ingest.put(episode, timeout=0.5)
+                            break
+                        except queue.Full:
+                            continue
+                    self._count(actor_id, episodes=1, steps=len(episode["rewards"]))
+                    send_message(sock, ACK, encode_json({"accepted": True}), self.compress_level)
+                elif kind == GET_WEIGHTS:
+                    have = decode_json(payload).get("version", 0)
+                    with self._weights_lock:
+                        version, weights = self._weights_version, self._weights
+                    if weights is None or have >= version:
+                        send_message(sock, NOT_MODIFIED, encode_json({"version": version}), self.compress_level)
+                    else:
+                        send_compressed(sock, WEIGHTS, weights)
+        except (ConnectionError, OSError) as e:
+            log.warning("Actor %s disconnected: %s", actor_id, e)
+
+    def stats_snapshot(self):
+        """Copy of the per-actor counters, safe to iterate while actors connect"""
+        with self._stats_lock:
+            return {actor_id: dict(entry) for actor_id, entry in self.stats.items()}
+
+    def _count(self, actor_id, **counts):
+        with self._stats_lock:
+            entry = self.stats.setdefault(actor_id, {"episodes": 0, "steps": 0, "connections": 0})
+            for key, value in counts.items():
+                entry[key] += value
+
+
+class ActorClient:
+    """Ships episodes to the learner on a background thread and pulls weights.
+
+    submit() blocks once `outbox_size` episodes are waiting, which is how
+    backpressure from the learner reaches the environment loop.
+    """
+
+    def __init__(self, host, port, actor_id, outbox_size=8, weights_interval=10.0,
+                 max_backoff=30.0, compress_level=1):
+        self.host = host
+        self.port = port
+        self.actor_id = actor_id
+        self.weights_interval = weights_interval
+        self.max_backoff = max_backoff
+        self.compress_level = compress_level
+        self.outbox = queue.Queue(maxsize=outbox_size)
+        self.sent_episodes = 0
+        self.reconnects = 0
+        self.weights_version = 0
+        self._new_weights = None
+        self._weights_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"actor-{actor_id}-sender", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, timeout=10.0):
+        """Stop after the outbox has been sent (or `timeout` expires)"""
+        deadline = time.monotonic() + timeout
+        while not self.outbox.empty() and time.monotonic() < deadline:
+            time.sleep(0.1)
+        self._stop.set()
+        self._thread.join(timeout=max(0.0, deadline - time.monotonic()))
+
+    def submit(self, episode):
+        """Queue an episode's arrays for the learner (blocks while the outbox is full)"""
+        while not self._stop.is_set():
+            try:
+                self.outbox.put(episode, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def poll_weights(self):
+        """Latest weights pulled from the learner, once, or None"""
+        with self._weights_lock:
+            weights, self._new_weights = self._new_weights, None
+        return weights
+
+    def _connect(self):
+        backoff = 0.5
+        while not self._stop.is_set():
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=30)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                send_message(sock, HELLO, encode_json({"actor_id": self.actor_id}), self.compress_level)
+                # The timeout only bounds connecting: a busy learner withholds the ACK
+                # for as long as it needs, and timing out would resend (and duplicate) the episode
+                sock.settimeout(None)
+                return sock
+            except OSError as e:
+                log.warning("Actor %s: learner unavailable (%s), retrying in %.1fs", self.actor_id, e, backoff)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+        return None
+
+    def _run(self):
+        sock = None
+        pending = None  # Sent but not acknowledged; resent after a reconnect
+        last_weights = 0.0
+        while not self._stop.is_set():
+            try:
+                if sock is None:
+                    sock = self._connect()
+                    if sock is None:
+                        break
+
+                if time.monotonic() - last_weights >= self.weights_interval:
+                    self._pull_weights(sock)
+                    last_weights = time.monotonic()
+
+                if pending is None:
+                    try:
+                        pending = encode_arrays(self.outbox.get(timeout=0.5))
+                    except queue.Empty:
+                        continue
+                send_message(sock, EPISODE, pending, self.compress_level)
+                kind, _ = recv_message(sock)
+                if kind != ACK:
+                    raise ConnectionError(f"unexpected message {kind} while waiting for ACK")
+                pending = None
+                self.sent_episodes += 1
+            except (ConnectionError, OSError) as e:
+                log.warning("Actor %s: connection lost (%s), reconnecting", self.actor_id, e)
+                if sock is not None:
+                    sock.close()
+                sock = None
+                self.reconnects += 1
+        if sock is not None:
+            sock.close()
+
+    def _pull_weights(self, sock):
+        send_message(sock, GET_WEIGHTS, encode_json({"version": self.weights_version}), self.compress_level)
+        kind, payload = recv_message(sock)
+        if kind == WEIGHTS:
+            (header_size,) = struct.unpack("!I", payload[:4])
+            header = decode_json(payload[4:4 + header_size])
+            arrays = decode_arrays(payload[4 + header_size:])
+            weights = [arrays[f"w{i}"] for i in range(len(arrays))]
+            with self._weights_lock:
+                self._new_weights = weights
+            self.weights_version = header["version"]
+        elif kind != NOT_MODIFIED:
+            raise ConnectionError(f"unexpected message {kind} while waiting for weights")
+
+
+def run_actor(args):
+    from CVModel import CVModel
+    img_shape = (args.obs_size, args.obs_size, 1 if args.grayscale else 3)
+    agent = CVModel(img_shape=img_shape)
+    agent.epsilon = actor_epsilon(args.actor_id, args.num_actors)
+    env = SimulatedButtonEnv(img_shape, agent.screen_width, agent.screen_height, seed=args.actor_id)
+
+    client = ActorClient(args.host, args.port, args.actor_id, weights_interval=args.weights_interval)
+    client.start()
+    log.info("Actor %s: epsilon=%.4f, sending to %s:%s", args.actor_id, agent.epsilon, args.host, args.port)
+    try:
+        for episode in range(args.episodes):
+            weights = client.poll_weights()
+            if weights is not None:
+                agent.model.set_weights(weights)
+
+            state = env.reset()
+            frames = [state]
+            actions, rewards = [], []
+            for step in range(args.steps_per_episode):
+                action = agent.act(state)
+                state, reward = env.step(action)
+                frames.append(state)
+                actions.append(agent.action_index[action])
+                rewards.append(reward)
+
+            # Whole episodes only, so n-step returns never span two actors' data
+            client.submit({
+                "frames": np.stack(frames),
+                "actions": np.array(actions, dtype=np.int32),
+                "rewards": np.array(rewards, dtype=np.float32),
+            })
+    finally:
+        client.stop()
+        log.info("Actor %s: sent %s episodes, %s reconnects", args.actor_id, client.sent_episodes, client.reconnects)
+
+
+def run_learner(args, ready=None, stop=None):
+    from CVModel import CVModel
+    img_shape = (args.obs_size, args.obs_size, 1 if args.grayscale else 3)
+    agent = CVModel(img_shape=img_shape, double_dqn=True, n_step=args.n_step)
+
+    server = LearnerServer(args.bind, args.port, queue_size=args.queue_size)
+    server.publish_weights(agent.model.get_weights())
+    server.start()
+    log.info("Learner listening on %s:%s", server.address[0], server.address[1])
+    if ready is not None:
+        ready.set()
+
+    stop = stop or threading.Event()
+    new_steps = 0
+    updates = 0
+    start = time.monotonic()
+    last_report = start
+    try:
+        while not stop.is_set() and (args.updates is None or updates < args.updates):
+            try:
+                episode = server.ingest.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+            frames, actions, rewards = episode["frames"], episode["actions"], episode["rewards"]
+            last = len(rewards) - 1
+            for i in range(len(rewards)):
+                # Actor episodes end at a step limit: truncated, not terminal
+                agent.remember(frames[i], agent.actions[int(actions[i])], float(rewards[i]), frames[i + 1],
+                               False, i == last)
+            new_steps += len(rewards)
+
+            # Keep the replay ratio fixed however many actors are feeding in
+            while new_steps >= args.train_every and len(agent.memory) >= agent.batch_size:
+                agent.replay()
+                new_steps -= args.train_every
+                updates += 1
+                if updates % args.publish_every == 0:
+                    server.publish_weights(agent.model.get_weights())
+
+            if time.monotonic() - last_report >= 10.0:
+                stats = server.stats_snapshot().values()
+                steps = sum(entry["steps"] for entry in stats)
+                log.info("Learner: %s updates, %s steps from %s actors (%.1f steps/s), queue %s",
+                         updates, steps, len(stats), steps / (time.monotonic() - start), server.ingest.qsize())
+                last_report = time.monotonic()
+    finally:
+        server.stop()
+        if args.weights:
+            agent.model.save_weights(args.weights)
+            log.info("Saved weights to %s", args.weights)
+
+
+def run_local(args):
+    """Learner in this process plus actor subprocesses, all on localhost"""
+    ready = threading.Event()
+    stop = threading.Event()
+    learner = threading.Thread(target=run_learner, args=(args, ready, stop), daemon=True)
+    learner.start()
+    ready.wait()
+
+    actors = []
+    for actor_id in range(args.actors):
+        command = [sys.executable, __file__, "actor", "--host", "127.0.0.1", "--port", str(args.port),
+                   "--actor-id", str(actor_id), "--num-actors", str(args.actors),
+                   "--episodes", str(args.episodes), "--steps-per-episode", str(args.steps_per_episode),
+                   "--obs-size", str(args.obs_size), "--weights-interval", str(args.weights_interval)]
+        if not args.grayscale:
+            command.append("--color")
+        actors.append(subprocess.Popen(command))
+
+    codes = [actor.wait() for actor in actors]
+    log.info("Actors finished with exit codes %s", codes)
+    stop.set()
+    learner.join(timeout=60)
+    return 0 if all(code == 0 for code in codes) else 1
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed actors and learner for CVModel")
+    parser.add_argument("role", choices=["learner", "actor", "local"])
+    parser.add_argument("--host", default="127.0.0.1", help="learner address (actor)")
+    parser.add_argument("--bind", default="0.0.0.0", help="address to listen on (learner)")
+    parser.add_argument("--port", type=int, default=5555)
+    parser.add_argument("--actor-id", type=int, default=0)
+    parser.add_argument("--num-actors", type=int, default=1, help="total actors, for per-actor exploration rates")
+    parser.add_argument("--actors", type=int, default=2, help="actor processes to start (local)")
+    parser.add_argument("--episodes", type=int, default=100, help="episodes per actor")
+    parser.add_argument("--steps-per-episode", type=int, default=20)
+    parser.add_argument("--obs-size", type=int, default=84)
+    parser.add_argument("--color", dest="grayscale", action="store_false")
+    parser.add_argument("--weights-interval", type=float, default=10.0, help="seconds between weight pulls (actor)")
+    parser.add_argument("--n-step", type=int, default=3)
+    parser.add_argument("--queue-size", type=int, default=64, help="episodes buffered before actors are throttled")
+    parser.add_argument("--train-every", type=int, default=4, help="new steps per training update")
+    parser.add_argument("--publish-every", type=int, default=50, help="updates between weight publications")
+    parser.add_argument("--updates", type=int, help="stop the learner after this many updates")
+    parser.add_argument("--weights", help="save learner weights here on exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging()
+    if args.role == "actor":
+        run_actor(args)
+    elif args.role == "learner":
+        run_learner(args)
+    else:
+        return run_local(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
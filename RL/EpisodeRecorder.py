@@ -0,0 +1,161 @@
+import os
+import time
+import numpy as np
+import tensorflow as tf
+
+# Features of one chunk record: up to steps_per_chunk consecutive steps of an
+# episode, with one more frame than steps (frame i + 1 is step i's next state)
+CHUNK_FEATURES = {
+    "frames": tf.io.VarLenFeature(tf.string),
+    "actions": tf.io.VarLenFeature(tf.int64),
+    "rewards": tf.io.VarLenFeature(tf.float32),
+    "dones": tf.io.VarLenFeature(tf.int64),
+}
+
+
+def to_uint8(frame):
+    """Frames in [0, 1] floats (or already uint8) as uint8 HxWxC"""
+    frame = np.asarray(frame)
+    if frame.dtype != np.uint8:
+        frame = np.clip(np.rint(frame * 255.0), 0, 255).astype(np.uint8)
+    if frame.ndim == 2:
+        frame = frame[:, :, None]
+    return frame
+
+
+class EpisodeRecorder:
+    """Writes trajectories to sharded TFRecord files as PNG-encoded uint8 frames.
+
+    Steps are grouped into chunks of consecutive transitions from one episode
+    so each frame is stored once; a chunk ends when it is full, the episode
+    ends or the stream of states breaks. Every `chunks_per_shard` chunks a new
+    shard file is started, so recording can be interrupted at any time
+    without losing more than the open chunk.
+    """
+
+    def __init__(self, directory, steps_per_chunk=32, chunks_per_shard=64, prefix=None):
+        self.directory = directory
+        self.steps_per_chunk = steps_per_chunk
+        self.chunks_per_shard = chunks_per_shard
+        self.prefix = prefix or time.strftime("episodes-%Y%m%d-%H%M%S")
+        os.makedirs(directory, exist_ok=True)
+
+        self.shard = 0
+        self.chunks_in_shard = 0
+        self.steps_written = 0
+        self._writer = None
+        self._frames = []
+        self._actions = []
+        self._rewards = []
+        self._dones = []
+        self._last_state = None
+
+    def record(self, state, action_index, reward, next_state, done, truncated=False):
+        """Add one transition; `action_index` is the agent's output column for the action.
+
+        Only `done` (a terminal state) is stored; `truncated` just ends the chunk.
+        """
+        # A step continues the chunk only if it starts where the last one ended
+        if self._frames and state is not self._last_state:
+            self._flush()
+        if not self._frames:
+            self._frames.append(self._encode(state))
+
+        self._frames.append(self._encode(next_state))
+        self._actions.append(int(action_index))
+        self._rewards.append(float(reward))
+        self._dones.append(int(bool(done)))
+        self._last_state = next_state
+
+        if done or truncated or len(self._actions) >= self.steps_per_chunk:
+            self._flush()
+            if not (done or truncated):
+                # The next chunk picks up from this step's next state
+                self._frames.append(self._encode(next_state))
+
+    def close(self):
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    @staticmethod
+    def _encode(frame):
+        return tf.io.encode_png(to_uint8(frame)).numpy()
+
+    def _flush(self):
+        if not self._actions:
+            self._frames = []
+            return
+
+        example = tf.train.Example(features=tf.train.Features(feature={
+            "frames": tf.train.Feature(bytes_list=tf.train.BytesList(value=self._frames)),
+            "actions": tf.train.Feature(int64_list=tf.train.Int64List(value=self._actions)),
+            "rewards": tf.train.Feature(float_list=tf.train.FloatList(value=self._rewards)),
+            "dones": tf.train.Feature(int64_list=tf.train.Int64List(value=self._dones)),
+        }))
+        if self._writer is None:
+            path = os.path.join(self.directory, f"{self.prefix}-{self.shard:05d}.tfrecord")
+            self._writer = tf.io.TFRecordWriter(path)
+        self._writer.write(example.SerializeToString())
+        self._writer.flush()
+        self.steps_written += len(self._actions)
+
+        self.chunks_in_shard += 1
+        if self.chunks_in_shard >= self.chunks_per_shard:
+            self._writer.close()
+            self._writer = None
+            self.shard += 1
+            self.chunks_in_shard = 0
+
+        self._frames = []
+        self._actions = []
+        self._rewards = []
+        self._dones = []
+
+
+def transition_dataset(pattern, img_shape, batch_size=32, shuffle_buffer=10000, normalize=False, seed=None):
+    """Stream recorded shards as batches of (states, actions, rewards, next_states, dones).
+
+    Shards are read in parallel and interleaved, frames are decoded in
+    parallel, transitions are shuffled across chunks and batches are
+    prefetched while the model trains on the previous one. Frames stay uint8
+    (CVModel normalizes in the graph); with `normalize` they are float32 in [0, 1].
+    """
+    autotune = tf.data.AUTOTUNE
+    channels = img_shape[-1]
+
+    def parse(record):
+        chunk = tf.io.parse_single_example(record, CHUNK_FEATURES)
+        frames = tf.map_fn(
+            lambda png: tf.io.decode_png(png, channels=channels),
+            tf.sparse.to_dense(chunk["frames"]),
+            fn_output_signature=tf.TensorSpec(img_shape, tf.uint8)
+        )
+        actions = tf.sparse.to_dense(chunk["actions"])
+        rewards = tf.sparse.to_dense(chunk["rewards"])
+        dones = tf.cast(tf.sparse.to_dense(chunk["dones"]), tf.float32)
+        return frames, actions, rewards, dones
+
+    def transitions(frames, actions, rewards, dones):
+        return tf.data.Dataset.from_tensor_slices((frames[:-1], actions, rewards, frames[1:], dones))
+
+    def prepare(states, actions, rewards, next_states, dones):
+        if normalize:
+            states = tf.cast(states, tf.float32) / 255.0
+            next_states = tf.cast(next_states, tf.float32) / 255.0
+        return states, actions, rewards, next_states, dones
+
+    files = tf.data.Dataset.list_files(pattern, shuffle=True, seed=seed)
+    dataset = files.interleave(
+        tf.data.TFRecordDataset,
+        cycle_length=autotune,
+        num_parallel_calls=autotune,
+        deterministic=False
+    )
+    dataset = dataset.map(parse, num_parallel_calls=autotune, deterministic=False)
+    dataset = dataset.flat_map(transitions)
+    dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size, drop_remainder=True)
+    dataset = dataset.map(prepare, num_parallel_calls=autotune)
+    return dataset.prefetch(autotune)
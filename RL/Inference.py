@@ -0,0 +1,52 @@
+import time
+import numpy as np
+import tensorflow as tf
+from collections import deque
+
+
+class CompiledPolicy:
+    """Single-step inference through a compiled, warmed-up forward pass.
+
+    Model.predict sets up a data pipeline on every call, which dominates the
+    cost of a batch of one. This traces the model once into a tf.function
+    with a fixed batch-of-one signature, copies each observation into a
+    preallocated input buffer and, with `greedy`, takes the argmax in the
+    graph so only the action index leaves it. Call latencies are kept for
+    latency_percentiles().
+    """
+
+    def __init__(self, model, greedy=True, window=1000):
+        self.model = model
+        self.greedy = greedy
+        specs = [tf.TensorSpec((1,) + tuple(tensor.shape[1:]), tensor.dtype) for tensor in model.inputs]
+        self._buffers = [np.zeros(spec.shape, spec.dtype.as_numpy_dtype) for spec in specs]
+        self.latencies_ms = deque(maxlen=window)
+
+        single_input = len(specs) == 1
+
+        @tf.function(input_signature=specs)
+        def forward(*inputs):
+            outputs = model(inputs[0] if single_input else list(inputs), training=False)[0]
+            if greedy:
+                return tf.argmax(outputs, output_type=tf.int32)
+            return outputs
+
+        self._forward = forward
+        # Trace and run once so the first real decision doesn't pay for it
+        self._forward(*self._buffers)
+
+    def __call__(self, *observations):
+        """Action index (greedy) or model outputs for one unbatched observation per model input"""
+        start = time.perf_counter()
+        for buffer, observation in zip(self._buffers, observations):
+            buffer[0] = observation
+        result = self._forward(*self._buffers).numpy()
+        self.latencies_ms.append((time.perf_counter() - start) * 1000.0)
+        return int(result) if self.greedy else result
+
+    def latency_percentiles(self):
+        if not self.latencies_ms:
+            return {"count": 0}
+        samples = np.fromiter(self.latencies_ms, dtype=np.float64)
+        p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+        return {"count": len(samples), "p50": p50, "p90": p90, "p99": p99, "max": samples.max()}
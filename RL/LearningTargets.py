@@ -0,0 +1,96 @@
+import numpy as np
+import tensorflow as tf
+
+
+def n_step_returns(rewards, dones, indices, n_step, gamma, truncated=None):
+    """Discounted n-step returns for the transitions at `indices`, in one pass.
+
+    `rewards`, `dones` and `truncated` are arrays over the whole replay store
+    in the order the transitions happened. Each return sums up to `n_step`
+    rewards and stops after the first transition that ends its episode,
+    either in a terminal state (`dones`) or cut off by a time limit
+    (`truncated`), or at the end of the store. Returns (returns, last,
+    discounts) where `last` is the index of the last transition included
+    (its next_state is the bootstrap state) and `discounts` is gamma**steps,
+    zeroed only for terminal states: a truncated episode still bootstraps.
+    """
+    size = len(rewards)
+    offsets = np.arange(n_step)
+    window = indices[:, None] + offsets[None, :]
+    valid = window < size
+    window = np.minimum(window, size - 1)
+
+    ends = dones if truncated is None else dones | truncated
+    window_dones = ends[window] & valid
+    # A reward counts if no earlier transition in the window ended the episode
+    ended_before = np.cumsum(window_dones, axis=1) - window_dones
+    included = valid & (ended_before == 0)
+
+    powers = gamma ** offsets
+    returns = np.sum(rewards[window] * powers[None, :] * included, axis=1)
+
+    steps = included.sum(axis=1)
+    last = indices + steps - 1
+    discounts = np.where(dones[last], 0.0, gamma ** steps)
+    return returns.astype(np.float32), last, discounts.astype(np.float32)
+
+
+class DoubleDQNTargets:
+    """n-step Double DQN learning targets computed for a whole minibatch.
+
+    The online network picks the best next action and a periodically synced
+    copy of it (the target network) evaluates that action, which avoids the
+    overestimation of taking the max over the online network's own values.
+    """
+
+    def __init__(self, model, n_step=3, gamma=0.95, target_update_interval=100):
+        self.model = model
+        self.n_step = n_step
+        self.gamma = gamma
+        self.target_update_interval = target_update_interval
+        self.target_model = tf.keras.models.clone_model(model)
+        self.updates = 0
+        self.sync()
+
+    def sync(self):
+        """Copy the online network's weights into the target network"""
+        self.target_model.set_weights(self.model.get_weights())
+
+    def compute(self, memory, indices, action_index):
+        """Return (states, targets) to train on for the transitions at `indices`.
+
+        `memory` is the agent's chronological list of
+        (state, action, reward, next_state, done, truncated) and
+        `action_index` maps an action to its output column.
+        """
+        indices = np.asarray(indices)
+        rewards = np.fromiter((transition[2] for transition in memory), dtype=np.float32, count=len(memory))
+        dones = np.fromiter((bool(transition[4]) for transition in memory), dtype=bool, count=len(memory))
+        truncated = np.fromiter((bool(transition[5]) for transition in memory), dtype=bool, count=len(memory))
+        returns, last, discounts = n_step_returns(rewards, dones, indices, self.n_step, self.gamma, truncated)
+
+        states = np.stack([memory[i][0] for i in indices])
+        bootstrap_states = np.stack([memory[i][3] for i in last])
+        actions = np.array([action_index[memory[i][1]] for i in indices])
+        return states, self.targets_for(states, actions, returns, bootstrap_states, discounts)
+
+    def targets_for(self, states, actions, returns, bootstrap_states, discounts):
+        """Q-value targets for a batch: the taken action's value becomes
+        returns + discounts * Q_target(bootstrap_state, argmax Q_online(bootstrap_state))
+        """
+        # One batched forward pass per network for the whole minibatch
+        q_values = np.array(self.model(states, training=False))
+        next_online = self.model(bootstrap_states, training=False)
+        next_target = self.target_model(bootstrap_states, training=False)
+        best_next = tf.argmax(next_online, axis=1)
+        next_values = tf.gather(next_target, best_next, axis=1, batch_dims=1).numpy()
+
+        rows = np.arange(len(q_values))
+        q_values[rows, np.asarray(actions)] = np.asarray(returns) + np.asarray(discounts) * next_values
+        return q_values
+
+    def step(self):
+        """Count a training update and sync the target network when due"""
+        self.updates += 1
+        if self.updates % self.target_update_interval == 0:
+            self.sync()
@@ -6,21 +6,28 @@ from tensorflow.keras.models import Model
 from tensorflow.keras.preprocessing.text import Tokenizer
 from tensorflow.keras.preprocessing.sequence import pad_sequences
 import random
+from Inference import CompiledPolicy
+from Autotuner import apply_profile, DEFAULT_PROFILE_PATH
 
 class MultiModalModel:
-    def __init__(self, img_shape=(224, 224, 3), max_text_length=20, vocab_size=5000, action_space=3):
+    def __init__(self, img_shape=(224, 224, 3), max_text_length=20, vocab_size=5000, action_space=3,
+                 profile=DEFAULT_PROFILE_PATH):
+        # Device and thread settings from the autotuner (python Autotuner.py), None to leave TensorFlow as is
+        tuned = apply_profile(profile) if profile else {}
+        self.batch_size = tuned.get("models", {}).get("multimodal", tuned).get("batch_size", 32)
         self.img_shape = img_shape
         self.max_text_length = max_text_length
         self.vocab_size = vocab_size
         self.action_space = action_space  # Move to (x, y) and click
         self.tokenizer = Tokenizer(num_words=vocab_size, oov_token="<OOV>")
-        self.model = self._build_model()
         self.memory = []  # Experience replay memory
         self.gamma = 0.95  # Discount factor
         self.epsilon = 1.0  # Exploration rate
         self.epsilon_min = 0.01
         self.epsilon_decay = 0.995
-        self.learning_rate = 0.001
+        self.learning_rate = 0.001  # Read by _build_model
+        self.model = self._build_model()
+        self.policy = CompiledPolicy(self.model, greedy=False)
 
     def _build_model(self):
         # Image encoder
@@ -63,10 +70,14 @@ class MultiModalModel:
         if np.random.rand() <= self.epsilon:
             return np.random.rand(3)  # Random (x, y, click)
         text_seq = self.preprocess_text([text])
-        q_values = self.model.predict([np.expand_dims(image, axis=0), text_seq])[0]
-        return q_values
+        return self.policy(image, text_seq[0])
+
+    def act_latency(self):
+        """Percentiles (ms) of the model's decision time in act()"""
+        return self.policy.latency_percentiles()
 
-    def replay(self, batch_size=32):
+    def replay(self, batch_size=None):
+        batch_size = batch_size or self.batch_size
         if len(self.memory) < batch_size:
             return
         minibatch = random.sample(self.memory, batch_size)
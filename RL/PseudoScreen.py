@@ -1,13 +1,32 @@
 import random
-from PyQt5.QtWidgets import QWidget, QPushButton
-from PyQt5.QtCore import QRect, pyqtSignal
+import logging
+import threading
+import numpy as np
+from PyQt5.QtWidgets import QWidget, QPushButton, QApplication
+from PyQt5.QtGui import QImage, QMouseEvent
+from PyQt5.QtCore import QRect, QPoint, QEvent, QThread, Qt, pyqtSignal
+
+log = logging.getLogger("rl")
+
+class ScreenClosed(RuntimeError):
+    """Raised by grab_frame() and click_at() once the Qt event loop has quit"""
 
 class PseudoScreen(QWidget):
     reward_updated = pyqtSignal(int)
+    # Runs a callable on the GUI thread for grab_frame() and click_at()
+    _invoke = pyqtSignal(object)
 
-    def __init__(self):
+    def __init__(self, size=None, show=True):
+        """Full screen by default; with `size` (width, height) a plain window, not shown unless `show`"""
         super().__init__()
         self.setWindowTitle("Button Reward Game")
+        self._invoke.connect(self._run_invoked, Qt.QueuedConnection)
+        self._frame_image = None
+        # Set when the event loop quits; calls from other threads stop waiting on it
+        self._closed = threading.Event()
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.close_drive)
 
         self.buttons = {
             "Red": QPushButton("Red Button", self),
@@ -18,7 +37,12 @@ class PseudoScreen(QWidget):
         self.rewards = {"Red": 0, "Green": 1, "Blue": 0}
         self.last_reward = -1
         self.total_rewards = 0
-        self.showFullScreen()
+        if size is None:
+            self.showFullScreen()
+        else:
+            self.resize(*size)
+            if show:
+                self.show()
 
         for color, button in self.buttons.items():
             button.setStyleSheet(f"background-color: {color.lower()}; color: white; font-size: 14px;")
@@ -28,7 +52,7 @@ class PseudoScreen(QWidget):
 
     def button_clicked(self, color):
         self.last_reward = self.rewards[color]
-        print(f"You clicked {color}! Reward: {self.last_reward}")
+        log.debug("You clicked %s! Reward: %s", color, self.last_reward)
         self.reward_updated.emit(self.last_reward)
         self.randomize_positions()
 
@@ -41,6 +65,90 @@ class PseudoScreen(QWidget):
             y = random.randint(0, screen_height - 40)
             button.setGeometry(QRect(x, y, 100, 40))
 
+    def grab_frame(self):
+        """RGB uint8 array of the widget as rendered, without an OS screenshot.
+
+        The array is a view of the grabbed QImage's pixels (rows may be
+        padded), valid until the next grab_frame() call. Callable from any
+        thread.
+        """
+        return self._on_gui_thread(self._grab_frame)
+
+    def click_at(self, x, y, source_size=None):
+        """Click the widget at (x, y) with synthetic mouse events and return the reward.
+
+        Coordinates are scaled from `source_size` (width, height), e.g. the
+        agent's screen size, to the widget. The click and button_clicked()
+        run before this returns, so the reward is already known: the clicked
+        button's reward, or -1 on a miss. Callable from any thread.
+        """
+        return self._on_gui_thread(self._click_at, x, y, source_size)
+
+    def close_drive(self):
+        """Make pending and future grab_frame()/click_at() calls raise ScreenClosed"""
+        self._closed.set()
+
+    def _on_gui_thread(self, fn, *args):
+        if QThread.currentThread() == self.thread():
+            return fn(*args)
+        if self._closed.is_set() or QApplication.closingDown():
+            raise ScreenClosed("the Qt event loop has stopped")
+        outcome = []
+        done = threading.Event()
+
+        def call():
+            # Exceptions can't propagate out of a slot; hand them back to the caller
+            try:
+                outcome.append((fn(*args), None))
+            except Exception as e:
+                outcome.append((None, e))
+            done.set()
+
+        # Queued rather than blocking: if the event loop quits before running
+        # it, waiting on `done` can still give up instead of hanging
+        self._invoke.emit(call)
+        while not done.wait(0.1):
+            if self._closed.is_set():
+                raise ScreenClosed("the Qt event loop stopped before the call ran")
+        result, error = outcome[0]
+        if error is not None:
+            raise error
+        return result
+
+    def _run_invoked(self, call):
+        call()
+
+    def _grab_frame(self):
+        image = self.grab().toImage()
+        if image.format() != QImage.Format_RGB888:
+            image = image.convertToFormat(QImage.Format_RGB888)
+        # Keep the image alive while the view is in use
+        self._frame_image = image
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+        return np.ndarray(
+            shape=(image.height(), image.width(), 3),
+            dtype=np.uint8,
+            buffer=bits,
+            strides=(image.bytesPerLine(), 3, 1)
+        )
+
+    def _click_at(self, x, y, source_size):
+        if source_size is not None:
+            x = x * self.width() / source_size[0]
+            y = y * self.height() / source_size[1]
+        point = QPoint(int(x), int(y))
+
+        self.last_reward = -1
+        # Hit-test the buttons directly; childAt() skips them while the window is hidden
+        target = next((button for button in self.buttons.values() if button.geometry().contains(point)), self)
+        local = target.mapFrom(self, point) if target is not self else point
+        press = QMouseEvent(QEvent.MouseButtonPress, local, Qt.LeftButton, Qt.LeftButton, Qt.NoModifier)
+        release = QMouseEvent(QEvent.MouseButtonRelease, local, Qt.LeftButton, Qt.NoButton, Qt.NoModifier)
+        QApplication.sendEvent(target, press)
+        QApplication.sendEvent(target, release)
+        return self.last_reward
+
     def get_reward(self):
         return self.last_reward if self.last_reward != -1 else -1
 
@@ -1,18 +1,28 @@
+import os
 import sys
+import argparse
+import signal
 import numpy as np
-import pyautogui
 import cv2
 import time
+import logging
+import functools
 import threading
 from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import pyqtSignal, QObject
-from PseudoScreen import PseudoScreen
+from PyQt5.QtCore import pyqtSignal, QObject, QTimer
+from PseudoScreen import PseudoScreen, ScreenClosed
 from CVModel import CVModel
+from EpisodeRecorder import EpisodeRecorder, transition_dataset
+from PerceptionCache import PerceptionCache
 from MatplotlibWidget import MatplotlibWidget
-from tensorflow.keras.preprocessing.image import img_to_array
-import keyboard
 import matplotlib.pyplot as plt
 
+# Run from the RL directory; make the project's Utils package importable too
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Utils.log import setup_logging
+
+log = logging.getLogger("rl")
+
 stop_flag = False
 
 class SignalEmitter(QObject):
@@ -20,62 +30,162 @@ class SignalEmitter(QObject):
 
 signal_emitter = SignalEmitter()
 
-def listen_for_quit():
+def request_stop():
     global stop_flag
-    print("Press 'q' at any time to stop...")
-    keyboard.wait('q')
     stop_flag = True
 
-def preprocess_image(image):
-    image = cv2.resize(image, (224, 224))
-    image = image.astype("float32") / 255.0
-    return img_to_array(image)
-
-def capture_screenshot():
-    screenshot = pyautogui.screenshot(region=(0, 0, 1920, 1080))
-    screenshot = np.array(screenshot)
-    screenshot = cv2.cvtColor(screenshot, cv2.COLOR_RGB2BGR)
-    return preprocess_image(screenshot)
-
-def rl_thread(screen):
-    agent = CVModel()
+def listen_for_quit():
+    # Global hotkeys need root on Linux, so only the OS-driven mode imports keyboard
+    import keyboard
+    log.info("Press 'q' at any time to stop...")
+    keyboard.wait('q')
+    request_stop()
+
+def quit_on_interrupt(app):
+    """Ctrl+C stops the RL thread and quits; direct mode has no global hotkey"""
+    def on_interrupt(*_):
+        log.info("Interrupted, stopping...")
+        request_stop()
+        app.quit()
+    signal.signal(signal.SIGINT, on_interrupt)
+    # Python signal handlers only run between bytecodes; wake the interpreter from the Qt loop.
+    # Parented to the app, which keeps it alive without a Python reference
+    timer = QTimer(app)
+    timer.timeout.connect(lambda: None)
+    timer.start(200)
+    return timer
+
+def observation_shape(args):
+    return (args.obs_size, args.obs_size, 1 if args.grayscale else 3)
+
+def preprocess_image(image, img_shape):
+    """RGB screenshot to a compact uint8 observation of img_shape (normalized in the model)"""
+    height, width, channels = img_shape
+    if channels == 1:
+        image = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    else:
+        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    # INTER_AREA averages the pixels being dropped, which suits large downscales
+    image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+    return image.reshape(img_shape)
+
+def grab_screen():
+    # Imported on use: pyautogui needs a display, which direct/headless mode doesn't have
+    import pyautogui
+    return np.asarray(pyautogui.screenshot(region=(0, 0, 1920, 1080)))
+
+def rl_thread(screen, args):
+    agent = CVModel(img_shape=observation_shape(args), double_dqn=args.double_dqn, n_step=args.n_step)
+    if args.weights and os.path.exists(args.weights):
+        agent.model.load_weights(args.weights)
+    # Keep every transition on disk, not just the ones still in replay memory
+    recorder = EpisodeRecorder(args.record) if args.record else None
+    # Missed clicks usually leave the screen as it was; skip re-preprocessing and re-inferring it
+    perception = PerceptionCache(functools.partial(preprocess_image, img_shape=agent.img_shape))
+    try:
+        _run_episodes(agent, screen, recorder, perception, direct=args.direct)
+    except ScreenClosed:
+        log.info("Screen closed, stopping RL thread")
+    finally:
+        if recorder is not None:
+            recorder.close()
+            log.info("Recorded %s steps to %s", recorder.steps_written, args.record)
+
+def _run_episodes(agent, screen, recorder, perception, direct=False):
     episodes = 100
+    steps_per_episode = 20
     all_rewards = []
+    # Direct drive renders and clicks the PseudoScreen widgets in-process instead of going through the OS
+    grab = screen.grab_frame if direct else grab_screen
+    screen_size = (agent.screen_width, agent.screen_height)
 
     for episode in range(episodes):
-        print(f"Episode {episode+1}/{episodes}")
-        state = capture_screenshot()
+        log.info("Episode %s/%s", episode + 1, episodes)
+        state, key = perception.observe(grab())
         done = False
         episode_reward = 0
-        for step in range(20):
+        for step in range(steps_per_episode):
             if stop_flag:
-                print("Stopping RL thread mid-episode...")
+                log.info("Stopping RL thread mid-episode...")
                 return
-            print(f"  Step {step+1}/20")
-            action = agent.act(state)
+            log.debug("Step %s/%s", step + 1, steps_per_episode)
+            action = agent.act(state, frame_key=key)
             x, y, click = int(action[0]), int(action[1]), int(action[2])
-            print(f"    Action taken: x={x}, y={y}, click={click}")
+            log.debug("Action taken: x=%s, y=%s, click=%s", x, y, click)
             if click:
-                print(f"    Clicking at ({x}, {y})")
-                pyautogui.click(x, y)
-            time.sleep(1)
-            next_state = capture_screenshot()
+                log.debug("Clicking at (%s, %s)", x, y)
+                if direct:
+                    # Handled, and the reward set, before this returns
+                    screen.click_at(x, y, screen_size)
+                else:
+                    import pyautogui
+                    pyautogui.click(x, y)
+            if not direct:
+                time.sleep(1)  # Let the OS deliver the click and the screen repaint
+            next_state, next_key = perception.observe(grab())
             reward = screen.get_reward()
             # screen.add_rewards(reward)
             episode_reward += reward
             screen.reset_reward()
-            print(f"    Reward received: {reward}, Total Rewards: {screen.get_total_rewards()}")
-            agent.remember(state, action, reward, next_state, done)
-            state = next_state
-        print(f"  Total reward for episode {episode+1}: {episode_reward}")
+            log.debug("Reward received: %s, Total Rewards: %s", reward, screen.get_total_rewards())
+            # Episodes are cut at a fixed length: that ends the n-step window but,
+            # unlike a terminal state, the value of next_state still counts
+            truncated = step == steps_per_episode - 1
+            agent.remember(state, action, reward, next_state, done, truncated)
+            if recorder is not None:
+                recorder.record(state, agent.action_index[action], reward, next_state, done, truncated)
+            state, key = next_state, next_key
+        log.info("Total reward for episode %s: %s", episode + 1, episode_reward)
+        latency = agent.act_latency()
+        if latency["count"]:
+            log.info("Act latency: p50=%.2fms p99=%.2fms (%s decisions)", latency['p50'], latency['p99'], latency['count'])
+        log.info("Unchanged frames: %.0f%% (%s greedy actions reused)", perception.hit_rate() * 100, agent.greedy_reuses)
         all_rewards.append(episode_reward)
         signal_emitter.update_plot_signal.emit(list(range(1, episode + 1)), all_rewards)
-        print(f"  Training agent...")
+        log.debug("Training agent...")
         agent.replay()
     plt.ioff()
     plt.show()
 
+def train_offline(args):
+    """Train on recorded shards without a live screen"""
+    agent = CVModel(img_shape=observation_shape(args))
+    if args.weights and os.path.exists(args.weights):
+        agent.model.load_weights(args.weights)
+    dataset = transition_dataset(args.offline, agent.img_shape, batch_size=args.batch_size or agent.batch_size, shuffle_buffer=args.shuffle_buffer)
+    for epoch in range(args.epochs):
+        trained = agent.train_offline(dataset, steps=args.offline_steps)
+        log.info("Epoch %s/%s: trained on %s batches", epoch + 1, args.epochs, trained)
+    if args.weights:
+        agent.model.save_weights(args.weights)
+        log.info("Saved weights to %s", args.weights)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the screen-clicking agent")
+    parser.add_argument("--record", metavar="DIR", help="record live transitions to TFRecord shards in DIR")
+    parser.add_argument("--offline", metavar="PATTERN", help="train on recorded shards matching PATTERN instead of the live screen")
+    parser.add_argument("--epochs", type=int, default=1, help="passes over the recorded data in offline mode")
+    parser.add_argument("--offline-steps", type=int, help="max batches per offline epoch")
+    parser.add_argument("--batch-size", type=int, help="training batch size (default: tuned profile, else 32)")
+    parser.add_argument("--shuffle-buffer", type=int, default=10000, help="transitions held for shuffling in offline mode")
+    parser.add_argument("--obs-size", type=int, default=84, help="observation width and height in pixels")
+    parser.add_argument("--color", dest="grayscale", action="store_false", help="keep color observations (default: grayscale)")
+    parser.add_argument("--direct", action="store_true", help="drive the PseudoScreen in-process (Qt grabs and synthetic clicks) instead of screenshots and OS clicks")
+    parser.add_argument("--headless", action="store_true", help="with --direct, run without a visible display")
+    parser.add_argument("--double-dqn", action="store_true", help="learn from Double DQN targets with a target network")
+    parser.add_argument("--n-step", type=int, default=1, help="n-step returns for live training (above 1 implies --double-dqn)")
+    parser.add_argument("--weights", help="load model weights from (and in offline mode save them to) this file")
+    return parser.parse_args(argv)
+
 def main():
+    args = parse_args()
+    setup_logging()
+    if args.offline:
+        train_offline(args)
+        return
+
+    if args.direct and args.headless:
+        os.environ["QT_QPA_PLATFORM"] = "offscreen"
     app = QApplication(sys.argv)
     matplotlib_widget = MatplotlibWidget()
     matplotlib_widget.setWindowTitle("Reinforcement Learning Reward Plot")
@@ -85,17 +195,27 @@ def main():
     def update_plot_slot(x, y):
         matplotlib_widget.showRewardPlot(x, y)
 
-    screen = PseudoScreen()
+    if args.direct:
+        # Same size as the agent's action space, so clicks map 1:1 and nothing needs to be on screen
+        screen = PseudoScreen(size=(1920, 1080), show=not args.headless)
+    else:
+        screen = PseudoScreen()
+        time.sleep(5)
 
-    time.sleep(5)
+    # Closing the windows ends the run; the RL thread stops at its next step
+    app.aboutToQuit.connect(request_stop)
 
-    print("Starting RL thread...")
-    rl_thread_instance = threading.Thread(target=rl_thread, args=(screen,))
+    log.info("Starting RL thread...")
+    rl_thread_instance = threading.Thread(target=rl_thread, args=(screen, args))
     rl_thread_instance.start()
 
-    print("Starting Quit Listener thread...")
-    quit_listener = threading.Thread(target=listen_for_quit)
-    quit_listener.start()
+    if args.direct:
+        quit_on_interrupt(app)
+        log.info("Press Ctrl+C at any time to stop...")
+    else:
+        log.info("Starting Quit Listener thread...")
+        quit_listener = threading.Thread(target=listen_for_quit)
+        quit_listener.start()
 
     plt.ion()
     signal_emitter.update_plot_signal.connect(update_plot_slot)
@@ -0,0 +1,124 @@
+from PyQt5.QtCore import QObject, QTimer, Qt
+from Utils.tracing import RollingHistogram
+import logging
+import time
+
+log = logging.getLogger("ui")
+
+MAX_FRAME_DT = 0.25  # seconds; longer gaps (stalls, sleeps) don't fast-forward animations
+
+
+class AnimationClock(QObject):
+    """One frame timer shared by every animated UI component.
+
+    Components add a callback that is called with the seconds since the last
+    frame. All callbacks run in the same timer event, so the updates they
+    request are painted together in one pass. Paint handlers report their
+    duration with record_paint(); a frame's cost is its callbacks plus the
+    paints that followed. When frames keep exceeding `budget` (a fraction of
+    the frame interval) the frame rate is lowered, down to `min_fps`, and it
+    is raised back towards `fps` once frames are cheap again.
+    """
+
+    def __init__(self, fps=15, min_fps=5, budget=0.75, window=300, parent=None):
+        super().__init__(parent)
+        self.target_fps = fps
+        self.fps = fps
+        self.min_fps = min(min_fps, fps)
+        self.budget = budget
+
+        self.frames = 0
+        self.dropped_frames = 0
+        self.frame_ms = RollingHistogram(window)
+        self.paint_ms = RollingHistogram(window)
+
+        self._callbacks = []
+        self._last_tick = None
+        self._frame_work = 0.0  # seconds spent on the current frame so far
+        self._over_budget = 0   # consecutive frames over budget
+        self._under_budget = 0  # consecutive frames well under budget
+
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._tick)
+
+    def add(self, callback):
+        """Call `callback(dt)` every frame; the clock runs while it has callbacks"""
+        if callback in self._callbacks:
+            return
+        self._callbacks.append(callback)
+        if not self._timer.isActive():
+            self._last_tick = None
+            self._timer.start(int(1000 / self.fps))
+
+    def remove(self, callback):
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+        if not self._callbacks:
+            self._timer.stop()
+
+    def is_running(self):
+        return self._timer.isActive()
+
+    def record_paint(self, seconds):
+        """Report time spent in a paintEvent driven by this clock"""
+        self.paint_ms.add(seconds * 1000.0)
+        self._frame_work += seconds
+
+    def stats(self):
+        return {
+            "fps": self.fps,
+            "target_fps": self.target_fps,
+            "frames": self.frames,
+            "dropped_frames": self.dropped_frames,
+            "frame_ms": self.frame_ms.summary(),
+            "paint_ms": self.paint_ms.summary(),
+        }
+
+    def _tick(self):
+        now = time.perf_counter()
+        interval = 1.0 / self.fps
+        if self._last_tick is None:
+            dt = interval
+        else:
+            dt = now - self._last_tick
+            # Ticks that should have happened in the gap were dropped
+            late = int(dt / interval + 0.5) - 1
+            if late > 0:
+                self.dropped_frames += late
+            self._finish_frame(interval)
+        self._last_tick = now
+
+        dt = min(dt, MAX_FRAME_DT)
+        for callback in list(self._callbacks):
+            callback(dt)
+        self.frames += 1
+        # Paints triggered by these callbacks are added by record_paint
+        self._frame_work = time.perf_counter() - now
+
+    def _finish_frame(self, interval):
+        """Account for the previous frame and adapt the frame rate to its cost"""
+        work = self._frame_work
+        self.frame_ms.add(work * 1000.0)
+
+        if work > interval * self.budget:
+            self._over_budget += 1
+            self._under_budget = 0
+        elif work < interval * self.budget * 0.5:
+            self._under_budget += 1
+            self._over_budget = 0
+        else:
+            self._over_budget = 0
+            self._under_budget = 0
+
+        if self._over_budget >= 3 and self.fps > self.min_fps:
+            self._set_fps(max(self.min_fps, self.fps * 0.75))
+        elif self._under_budget >= 2 * self.fps and self.fps < self.target_fps:
+            self._set_fps(min(self.target_fps, self.fps * 1.25))
+
+    def _set_fps(self, fps):
+        log.info("Animation frame rate %.1f -> %.1f FPS", self.fps, fps)
+        self.fps = fps
+        self._over_budget = 0
+        self._under_budget = 0
+        self._timer.setInterval(int(1000 / fps))
@@ -1,9 +1,48 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QApplication
-from PyQt5.QtGui import QPainter, QColor, QPen, QLinearGradient
-from PyQt5.QtCore import Qt, QTimer, QPointF, QSize
+from PyQt5.QtGui import QPainter, QColor, QLinearGradient, QImage, QPixmap, QRegion, QTransform
+from PyQt5.QtCore import Qt, QPointF, QRect, QRectF
 from .robot_face import RobotFaceWidget
+from .animation_clock import AnimationClock
 from Utils import config
 import math
+import time
+from functools import partial
+
+# Smooth rainbow colors of the border gradient
+RAINBOW_STOPS = (
+    (0.0, QColor(255, 0, 0)),          # Red
+    (1.0 / 6.0, QColor(255, 165, 0)),  # Orange
+    (2.0 / 6.0, QColor(255, 255, 0)),  # Yellow
+    (3.0 / 6.0, QColor(0, 255, 0)),    # Green
+    (4.0 / 6.0, QColor(0, 0, 255)),    # Blue
+    (5.0 / 6.0, QColor(75, 0, 130)),   # Indigo
+    (1.0, QColor(238, 130, 238)),      # Violet
+)
+GRADIENT_TEXTURE_SIZE = 256  # texels in the precomputed gradient strip
+_TRANSPOSE = QTransform(0, 1, 1, 0, 0, 0)
+
+
+def _gradient_textures(size=GRADIENT_TEXTURE_SIZE):
+    """Render the rainbow once into 1px strips.
+
+    Returns {(vertical, reversed): QPixmap}; texel i of a forward strip holds
+    the gradient color at position i / size.
+    """
+    image = QImage(size, 1, QImage.Format_ARGB32_Premultiplied)
+    gradient = QLinearGradient(QPointF(0, 0), QPointF(size, 0))
+    for position, color in RAINBOW_STOPS:
+        gradient.setColorAt(position, color)
+    painter = QPainter(image)
+    painter.fillRect(image.rect(), gradient)
+    painter.end()
+
+    reversed_image = image.mirrored(True, False)
+    return {
+        (False, False): QPixmap.fromImage(image),
+        (False, True): QPixmap.fromImage(reversed_image),
+        (True, False): QPixmap.fromImage(image.transformed(_TRANSPOSE)),
+        (True, True): QPixmap.fromImage(reversed_image.transformed(_TRANSPOSE)),
+    }
 
 class MainWindow(QWidget):
     def __init__(self):
@@ -20,8 +59,11 @@ class MainWindow(QWidget):
         # Get screen geometry
         self.screen_geometry = QApplication.primaryScreen().geometry()
 
+        # One frame clock drives the border and the face so they repaint together
+        self.animation_clock = AnimationClock(config.ANIMATION_FPS, parent=self)
+
         # Create the face widget - Give it a reference to self if needed, or use signals
-        self.face_widget = RobotFaceWidget(self)
+        self.face_widget = RobotFaceWidget(self, clock=self.animation_clock)
 
         # Set up layout
         layout = QVBoxLayout(self)
@@ -30,11 +72,11 @@ class MainWindow(QWidget):
         self.setLayout(layout)
 
         # Rainbow gradient animation
-        self.gradient_angle = 0
-        self.gradient_timer = QTimer(self)
-        self.gradient_timer.timeout.connect(self._update_gradient)
-        # Use interval from config
-        self.gradient_timer.start(config.GRADIENT_UPDATE_INTERVAL)
+        # Rotates one degree per GRADIENT_UPDATE_INTERVAL ms, on animation clock frames while shown
+        self.gradient_angle = 0.0
+        self._gradient_textures = _gradient_textures()
+        self._border_strips = []
+        self._border_region = QRegion()
 
         # Initially hide the window
         self.hide()
@@ -62,10 +104,42 @@ class MainWindow(QWidget):
         face_y = margins.top() + (available_h - face_h) // 2
         # self.face_widget.move(face_x, face_y) # Usually layout handles this, check if needed
 
-    def _update_gradient(self):
-        """Updates the rainbow gradient animation."""
-        self.gradient_angle = (self.gradient_angle + 1) % 360
-        self.update() # Request a repaint
+    def _update_gradient(self, dt):
+        """Updates the rainbow gradient animation (animation clock callback)."""
+        self.gradient_angle = (self.gradient_angle + dt * 1000.0 / config.GRADIENT_UPDATE_INTERVAL) % 360
+        # Only the border changes, so don't invalidate the whole (full-screen) window
+        self.update(self._border_region)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.animation_clock.add(self._update_gradient)
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.animation_clock.remove(self._update_gradient)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # Border strips as (rect, vertical); corners belong to the top and bottom strips
+        w, h = self.width(), self.height()
+        border_width = config.BORDER_WIDTH
+        self._border_strips = [
+            (QRect(0, 0, w, border_width), False),
+            (QRect(0, h - border_width, w, border_width), False),
+            (QRect(0, border_width, border_width, h - 2 * border_width), True),
+            (QRect(w - border_width, border_width, border_width, h - 2 * border_width), True),
+        ]
+        self._border_region = QRegion()
+        for rect, _ in self._border_strips:
+            self._border_region += rect
+
+    def _gradient_position(self, x, y, cos_a, sin_a):
+        """Position (0-1) of a point along the rotating rainbow gradient"""
+        center_x = self.width() / 2.0
+        center_y = self.height() / 2.0
+        # The gradient spans the window diagonal so it covers the corners
+        diameter = 2.0 * math.sqrt(center_x**2 + center_y**2)
+        return 0.5 - ((x - center_x) * cos_a + (y - center_y) * sin_a) / diameter
 
     def paintEvent(self, event):
         """Draws the rainbow gradient border."""
@@ -75,44 +149,42 @@ class MainWindow(QWidget):
             painter.fillRect(self.rect(), Qt.transparent)
             return # Skip drawing border if minimized or hidden
 
+        paint_start = time.perf_counter()
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-
-        # Create rainbow gradient
-        center_x = self.width() / 2.0
-        center_y = self.height() / 2.0
-        # Radius slightly larger to ensure gradient covers corners well
-        radius = math.sqrt(center_x**2 + center_y**2)
-
-        # Convert angle to radians
-        angle_rad = math.radians(self.gradient_angle) # Use math.radians
-
-        # Calculate start and end points for the gradient rotation
-        start_x = center_x + radius * math.cos(angle_rad)
-        start_y = center_y + radius * math.sin(angle_rad)
-        end_x = center_x - radius * math.cos(angle_rad) # Opposite direction
-        end_y = center_y - radius * math.sin(angle_rad) # Opposite direction
-
-        gradient = QLinearGradient(QPointF(start_x, start_y), QPointF(end_x, end_y))
-        # Smooth Rainbow Colors
-        gradient.setColorAt(0.0, QColor(255, 0, 0))     # Red
-        gradient.setColorAt(1.0/6.0, QColor(255, 165, 0)) # Orange
-        gradient.setColorAt(2.0/6.0, QColor(255, 255, 0)) # Yellow
-        gradient.setColorAt(3.0/6.0, QColor(0, 255, 0))   # Green
-        gradient.setColorAt(4.0/6.0, QColor(0, 0, 255))   # Blue
-        gradient.setColorAt(5.0/6.0, QColor(75, 0, 130))  # Indigo
-        gradient.setColorAt(1.0, QColor(238, 130, 238)) # Violet (or repeat Red for seamless loop)
-        # gradient.setColorAt(1.0, QColor(255, 0, 0)) # Option: Repeat Red for seamless loop
-
-        # Draw border using config width
-        border_width = config.BORDER_WIDTH
-        pen = QPen(gradient, border_width)
-        pen.setCapStyle(Qt.FlatCap) # Use flat cap for cleaner corners
-        painter.setPen(pen)
-        painter.setBrush(Qt.NoBrush)
-        # Draw rectangle slightly inset so the pen width is centered on the edge
-        draw_rect = self.rect().adjusted(border_width // 2, border_width // 2, -border_width // 2, -border_width // 2)
-        painter.drawRect(draw_rect)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+
+        # Each strip is a stretched slice of the precomputed gradient texture:
+        # along a straight edge the gradient position changes linearly
+        angle_rad = math.radians(self.gradient_angle)
+        cos_a, sin_a = math.cos(angle_rad), math.sin(angle_rad)
+        size = GRADIENT_TEXTURE_SIZE
+        dirty = event.rect()
+        for rect, vertical in self._border_strips:
+            if not rect.intersects(dirty):
+                continue
+            center = QRectF(rect).center()
+            if vertical:
+                t0 = self._gradient_position(center.x(), rect.top(), cos_a, sin_a)
+                t1 = self._gradient_position(center.x(), rect.bottom() + 1, cos_a, sin_a)
+            else:
+                t0 = self._gradient_position(rect.left(), center.y(), cos_a, sin_a)
+                t1 = self._gradient_position(rect.right() + 1, center.y(), cos_a, sin_a)
+
+            backwards = t1 < t0
+            texture = self._gradient_textures[(vertical, backwards)]
+            if backwards:
+                t0, t1 = 1.0 - t0, 1.0 - t1
+            # Keep at least one texel so edges parallel to the gradient's bands still get a color
+            length = max((t1 - t0) * size, 1.0)
+            start = min(t0 * size, size - length)
+            if vertical:
+                source = QRectF(0, start, 1, length)
+            else:
+                source = QRectF(start, 0, length, 1)
+            painter.drawPixmap(QRectF(rect), texture, source)
+
+        painter.end()
+        self.animation_clock.record_paint(time.perf_counter() - paint_start)
 
     def mouseMoveEvent(self, event):
         """Forward mouse position to face widget for eye tracking."""
@@ -166,5 +238,16 @@ class MainWindow(QWidget):
         self.voice_controller.minimize_window.connect(self.minimize, Qt.QueuedConnection)
         self.voice_controller.close_window.connect(self.hide, Qt.QueuedConnection)
 
+        # Connected after the window slots so the trace closes once the window has changed
+        for name in ("show_window", "minimize_window", "close_window"):
+            signal = getattr(self.voice_controller, name)
+            signal.connect(partial(self._on_voice_signal_delivered, name), Qt.QueuedConnection)
+
         self.voice_controller.started_speaking.connect(self.face_widget.start_talking, Qt.QueuedConnection)
-        self.voice_controller.finished_speaking.connect(self.face_widget.stop_talking, Qt.QueuedConnection)
\ No newline at end of file
+        self.voice_controller.finished_speaking.connect(self.face_widget.stop_talking, Qt.QueuedConnection)
+
+    def _on_voice_signal_delivered(self, signal):
+        """Close the latency trace of the utterance that triggered a window change."""
+        tracer = getattr(self.voice_controller, "tracer", None)
+        if tracer is not None:
+            tracer.delivered(signal)
\ No newline at end of file
@@ -1,11 +1,33 @@
 from PyQt5.QtWidgets import QWidget
-from PyQt5.QtGui import QPainter, QColor, QPen, QBrush, QPolygonF
-from PyQt5.QtCore import Qt, QTimer, QPointF, QRectF, QSize
+from PyQt5.QtGui import QPainter, QPen, QBrush, QPixmap
+from PyQt5.QtCore import Qt, QTimer, QPointF, QRectF, QSize, QSizeF
+from collections import namedtuple
+from .animation_clock import AnimationClock
+from Utils import config
 import random
 import math
+import time
+
+# Animation counters below count steps at this fixed rate, whatever the frame rate
+ANIMATION_STEP_RATE = 30
+MAX_STEPS_PER_FRAME = 8
+
+# Layout of the face features for one widget size
+FaceGeometry = namedtuple("FaceGeometry", [
+    "pen_width", "left_eye", "right_eye", "pupil_radius", "pupil_limit",
+    "mouth_center", "mouth_width_max", "mouth_height_max"
+])
+
+# Talking mouth_state -> (height, width) as a fraction of the maximum mouth size
+MOUTH_SHAPES = {
+    0: (0.2, 0.8),
+    1: (0.6, 0.9),
+    2: (1.0, 1.0),
+    3: (0.7, 0.6),
+}
 
 class RobotFaceWidget(QWidget):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, clock=None):
         super().__init__(parent)
         self.is_talking = False
         self.mouth_state = 0  # 0: closed, 1-3: open states
@@ -21,92 +43,167 @@ class RobotFaceWidget(QWidget):
         self.pupil_move_timer_count = 0
         self.time_to_next_pupil_move = random.randint(30, 80)
 
-        # Animation timer
-        self.animation_timer = QTimer(self)
-        self.animation_timer.timeout.connect(self._update_animation)
-        self.animation_timer.start(1000 // 30)  # 30 FPS
+        # Frames come from the shared UI clock, only while visible and something is moving
+        self.clock = clock or AnimationClock(config.ANIMATION_FPS, parent=self)
+        self.step_interval = 1000.0 / ANIMATION_STEP_RATE
+        self._step_debt = 0.0  # fractional animation steps carried to the next frame
+
+        # While at rest, a single-shot timer sleeps until the next blink or pupil move
+        self.wake_timer = QTimer(self)
+        self.wake_timer.setSingleShot(True)
+        self.wake_timer.timeout.connect(self._on_wake_timer)
+        self._sleep_ticks = 0
+        self._sleep_started = 0.0
+
+        # Pre-rendered feature sprites keyed by (feature, state), cleared on resize
+        self._sprites = {}
+        self._geometry = None
 
         self.setMinimumSize(200, 100)
 
     def sizeHint(self):
         return QSize(300, 150)
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # Sprites and geometry are rendered for one size only
+        self._geometry = None
+        self._sprites.clear()
+
+    def _face_geometry(self):
+        """Feature positions and sizes for the current widget size"""
+        if self._geometry is not None:
+            return self._geometry
 
         w = self.width()
         h = self.height()
 
-        # Clear background
-        painter.fillRect(self.rect(), Qt.transparent)
-
-        # Set drawing color to white
-        pen_width = max(2, int(min(w, h) * 0.015))
-        painter.setPen(QPen(Qt.white, pen_width, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
-        painter.setBrush(QBrush(Qt.white, Qt.SolidPattern))
-
-        # Draw Eyes
         eye_width = w * 0.25
         eye_height = h * 0.35
         eye_y = h * 0.25
         eye_spacing = w * 0.08
-
         left_eye_x = w * 0.5 - eye_spacing / 2 - eye_width
         right_eye_x = w * 0.5 + eye_spacing / 2
+        pupil_radius = eye_height * 0.25
+
+        self._geometry = FaceGeometry(
+            pen_width=max(2, int(min(w, h) * 0.015)),
+            left_eye=QRectF(left_eye_x, eye_y, eye_width, eye_height),
+            right_eye=QRectF(right_eye_x, eye_y, eye_width, eye_height),
+            pupil_radius=pupil_radius,
+            pupil_limit=QPointF(eye_width / 2 - pupil_radius, eye_height / 2 - pupil_radius),
+            mouth_center=QPointF(w / 2, h * 0.75),
+            mouth_width_max=w * 0.4,
+            mouth_height_max=h * 0.15
+        )
+        return self._geometry
+
+    def _sprite(self, key, size, draw):
+        """Pre-rendered white feature of `size`, drawn once by draw(painter, rect).
+
+        Returns (pixmap, padding); the feature's rect starts `padding` pixels
+        into the pixmap so the pen stroke isn't clipped.
+        """
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            return sprite
+
+        geometry = self._face_geometry()
+        pad = geometry.pen_width
+        dpr = self.devicePixelRatioF()
+        pixmap = QPixmap(math.ceil((size.width() + 2 * pad) * dpr), math.ceil((size.height() + 2 * pad) * dpr))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.transparent)
+
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(Qt.white, geometry.pen_width, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin))
+        painter.setBrush(QBrush(Qt.white, Qt.SolidPattern))
+        draw(painter, QRectF(QPointF(pad, pad), size))
+        painter.end()
 
-        left_eye_rect = QRectF(left_eye_x, eye_y, eye_width, eye_height)
-        right_eye_rect = QRectF(right_eye_x, eye_y, eye_width, eye_height)
-
-        if self.eyes_open:
-            painter.drawEllipse(left_eye_rect)
-            painter.drawEllipse(right_eye_rect)
+        sprite = self._sprites[key] = (pixmap, pad)
+        return sprite
 
-            pupil_radius = eye_height * 0.25
-            pupil_offset_limit_x = eye_width / 2 - pupil_radius
-            pupil_offset_limit_y = eye_height / 2 - pupil_radius
+    @staticmethod
+    def _blit(painter, sprite, top_left):
+        pixmap, pad = sprite
+        painter.drawPixmap(top_left - QPointF(pad, pad), pixmap)
 
-            clamped_offset_x = max(-pupil_offset_limit_x, min(pupil_offset_limit_x, self.pupil_offset.x()))
-            clamped_offset_y = max(-pupil_offset_limit_y, min(pupil_offset_limit_y, self.pupil_offset.y()))
-            current_pupil_offset = QPointF(clamped_offset_x, clamped_offset_y)
+    def _mouth_rect(self, geometry):
+        """Mouth ellipse for the current talking state"""
+        scale_h, scale_w = MOUTH_SHAPES.get(self.mouth_state, MOUTH_SHAPES[3])
+        mouth_h = geometry.mouth_height_max * scale_h
+        mouth_w = geometry.mouth_width_max * scale_w
+        center = geometry.mouth_center
+        return QRectF(center.x() - mouth_w / 2, center.y() - mouth_h / 2, mouth_w, mouth_h)
 
-            left_pupil_center = left_eye_rect.center() + current_pupil_offset
-            right_pupil_center = right_eye_rect.center() + current_pupil_offset
+    def paintEvent(self, event):
+        paint_start = time.perf_counter()
+        painter = QPainter(self)
+        geometry = self._face_geometry()
+        left_eye = geometry.left_eye
+        right_eye = geometry.right_eye
 
-            painter.drawEllipse(left_pupil_center, pupil_radius, pupil_radius)
-            painter.drawEllipse(right_pupil_center, pupil_radius, pupil_radius)
+        # Draw Eyes
+        if self.eyes_open:
+            eye = self._sprite(("eye", True), left_eye.size(), lambda p, r: p.drawEllipse(r))
+            self._blit(painter, eye, left_eye.topLeft())
+            self._blit(painter, eye, right_eye.topLeft())
+
+            # Pupils move continuously, so only their shape is cached
+            radius = geometry.pupil_radius
+            limit = geometry.pupil_limit
+            current_pupil_offset = QPointF(
+                max(-limit.x(), min(limit.x(), self.pupil_offset.x())),
+                max(-limit.y(), min(limit.y(), self.pupil_offset.y()))
+            )
+            pupil = self._sprite(("pupil",), QSizeF(2 * radius, 2 * radius), lambda p, r: p.drawEllipse(r))
+            corner = QPointF(radius, radius)
+            self._blit(painter, pupil, left_eye.center() + current_pupil_offset - corner)
+            self._blit(painter, pupil, right_eye.center() + current_pupil_offset - corner)
         else:
-            line_y = eye_y + eye_height / 2
-            painter.drawLine(int(left_eye_x), int(line_y), int(left_eye_x + eye_width), int(line_y))
-            painter.drawLine(int(right_eye_x), int(line_y), int(right_eye_x + eye_width), int(line_y))
+            line = QSizeF(left_eye.width(), 0)
+            closed = self._sprite(("eye", False), line, lambda p, r: p.drawLine(r.topLeft(), r.topRight()))
+            line_y = left_eye.center().y()
+            self._blit(painter, closed, QPointF(left_eye.left(), line_y))
+            self._blit(painter, closed, QPointF(right_eye.left(), line_y))
 
         # Draw Mouth
-        mouth_y = h * 0.75
-        mouth_width_max = w * 0.4
-        mouth_height_max = h * 0.15
-        mouth_center_x = w / 2
-
         if self.is_talking:
-            if self.mouth_state == 0:
-                mouth_h = mouth_height_max * 0.2
-                mouth_w = mouth_width_max * 0.8
-            elif self.mouth_state == 1:
-                mouth_h = mouth_height_max * 0.6
-                mouth_w = mouth_width_max * 0.9
-            elif self.mouth_state == 2:
-                mouth_h = mouth_height_max * 1.0
-                mouth_w = mouth_width_max * 1.0
-            else:  # state 3
-                mouth_h = mouth_height_max * 0.7
-                mouth_w = mouth_width_max * 0.6
-
-            mouth_rect = QRectF(mouth_center_x - mouth_w / 2, mouth_y - mouth_h / 2, mouth_w, mouth_h)
-            painter.drawEllipse(mouth_rect)
+            mouth_rect = self._mouth_rect(geometry)
+            mouth = self._sprite(("mouth", self.mouth_state), mouth_rect.size(), lambda p, r: p.drawEllipse(r))
+            self._blit(painter, mouth, mouth_rect.topLeft())
         else:
-            mouth_w = mouth_width_max * 0.7
-            painter.drawLine(int(mouth_center_x - mouth_w / 2), int(mouth_y), int(mouth_center_x + mouth_w / 2), int(mouth_y))
+            mouth_w = geometry.mouth_width_max * 0.7
+            center = geometry.mouth_center
+            line = QSizeF(mouth_w, 0)
+            mouth = self._sprite(("mouth", None), line, lambda p, r: p.drawLine(r.topLeft(), r.topRight()))
+            self._blit(painter, mouth, QPointF(center.x() - mouth_w / 2, center.y()))
+
+        painter.end()
+        self.clock.record_paint(time.perf_counter() - paint_start)
+
+    def _on_frame(self, dt):
+        """Clock callback: run the animation steps due after `dt` seconds and repaint once"""
+        self._step_debt += dt * ANIMATION_STEP_RATE
+        steps = min(int(self._step_debt), MAX_STEPS_PER_FRAME)
+        self._step_debt -= int(self._step_debt)
+
+        changed = False
+        for _ in range(steps):
+            changed = self._update_animation() or changed
+            if self._at_rest():
+                break
+
+        if changed:
+            self.update()
+
+        if self._at_rest():
+            self._sleep()
 
     def _update_animation(self):
+        """Advance the animation by one step; returns whether anything visible changed"""
         changed = False
 
         # Mouth Animation
@@ -156,20 +253,58 @@ class RobotFaceWidget(QWidget):
             self.pupil_offset = self.pupil_target_offset
             changed = True
 
-        if changed:
-            self.update()
-
-    def start_talking(self):
-        if not self.is_talking:
-            self.is_talking = True
-            self.mouth_state = random.randint(0, 3)
-            self.mouth_timer_count = 0
-            self.update()
-
-    def stop_talking(self):
-        if self.is_talking:
-            self.is_talking = False
-            self.update()
+        return changed
+
+    def _at_rest(self):
+        """True when nothing will change until the next blink or pupil move"""
+        return (not self.is_talking
+                and self.mouth_state == 0
+                and self.eyes_open
+                and self.pupil_offset == self.pupil_target_offset)
+
+    def _sleep(self):
+        """Stop per-frame updates until the next scheduled blink or pupil move"""
+        ticks = min(self.time_to_next_blink - self.blink_counter,
+                    self.time_to_next_pupil_move - self.pupil_move_timer_count)
+        # The event itself happens on a regular frame after waking
+        self._sleep_ticks = ticks - 1
+        if self._sleep_ticks <= 0:
+            return
+        self.clock.remove(self._on_frame)
+        self._sleep_started = time.monotonic()
+        self.wake_timer.start(int(self._sleep_ticks * self.step_interval))
+
+    def _advance_idle(self, ticks):
+        """Credit steps skipped while asleep to the blink and pupil counters"""
+        self.blink_counter += ticks
+        self.pupil_move_timer_count += ticks
+
+    def _on_wake_timer(self):
+        self._advance_idle(self._sleep_ticks)
+        self._sleep_ticks = 0
+        self.clock.add(self._on_frame)
+
+    def wake(self):
+        """Resume per-frame animation immediately, e.g. on talking or mouse input"""
+        if not self.isVisible():
+            return
+        if self.wake_timer.isActive():
+            self.wake_timer.stop()
+            slept = int((time.monotonic() - self._sleep_started) * 1000 / self.step_interval)
+            self._advance_idle(min(slept, self._sleep_ticks))
+            self._sleep_ticks = 0
+        self.clock.add(self._on_frame)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.wake()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        # Nothing to animate while hidden; counters resume where they left off
+        self.clock.remove(self._on_frame)
+        self.wake_timer.stop()
+        self._sleep_ticks = 0
 
     def look_at_point(self, target_point: QPointF):
         center = QPointF(self.width() / 2, self.height() / 2)
@@ -182,21 +317,21 @@ class RobotFaceWidget(QWidget):
         target_x = max(-max_offset_x, min(max_offset_x, vector_to_target.x() * scale_factor))
         target_y = max(-max_offset_y, min(max_offset_y, vector_to_target.y() * scale_factor))
 
-        self.pupil_target_offset = QPointF(target_x, target_y)
+        new_target = QPointF(target_x, target_y)
+        if new_target != self.pupil_target_offset:
+            self.pupil_target_offset = new_target
+            self.wake()
 
     def start_talking(self):
-        print("DEBUG: start_talking called") # Add print for debugging
         if not self.is_talking:
             self.is_talking = True
             self.mouth_state = random.randint(1, 3) # Start with open mouth
             self.mouth_timer_count = 0
-            self._update_animation() # Trigger immediate update potentially needed
-            # self.update() # Request repaint
+            self.update()
+            self.wake()
 
     def stop_talking(self):
-        print("DEBUG: stop_talking called") # Add print for debugging
         if self.is_talking:
             self.is_talking = False
-            # self.mouth_state = 0 # Set explicitly to closed
-            # self._update_animation() # Trigger immediate update potentially needed
-            # self.update() # Request repaint
+            # The next frame closes the mouth and goes back to sleep
+            self.wake()
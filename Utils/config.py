@@ -1,7 +1,62 @@
+import os
+
 # Voice recognition settings
 VOICE_TIMEOUT = 1  # seconds to wait for phrase start
 VOICE_PHRASE_TIME_LIMIT = 5  # max seconds for a phrase
 
+# Command execution settings
+COMMAND_WORKERS = 4  # max shell commands running at once
+SHELL_COMMAND_TIMEOUT = 15  # seconds before a shell command is cancelled
+
+# Run audio capture, recognition and commands in a child process so they don't
+# share the GIL with the UI; the UI survives (and restarts) a crashed voice process
+VOICE_PROCESS = False
+VOICE_PROCESS_RESTARTS = 3  # restarts after a crash before giving up
+
+# Wake word
+WAKE_WORD = "hey jarvis"  # a command may follow it in the same breath ("hey jarvis open chrome")
+WAKE_CONTINUATION_GRACE = 3.0  # seconds after the wake word within which a following utterance must start to be joined to its leftover words
+
+# Speech recognition backends
+VOSK_MODEL_PATH = None  # path to a downloaded Vosk model directory enables offline recognition
+# Tried in this order, failing over on errors; vosk only once a model is configured
+RECOGNITION_BACKENDS = ["google", "vosk"] if VOSK_MODEL_PATH else ["google"]
+RECOGNITION_WORKERS = 2  # utterances transcribed at once
+RECOGNITION_TIMEOUT = 5  # seconds before an online recognition request fails over
+RECOGNITION_SLOW_THRESHOLD = 3.0  # seconds; slower backends are demoted
+RECOGNITION_COOLDOWN = 30  # seconds a failing or slow backend stays demoted
+# Streaming recognition (needs a backend with partial results, e.g. vosk)
+STREAM_EARLY_ACTION = "dispatch"  # "dispatch", "prepare" or "off" for commands stable in partial transcripts
+STREAM_STABLE_FRAMES = 4  # consecutive audio frames a partial match must hold before acting on it
+
+# Text-to-speech settings
+TTS_RATE = 180  # words per minute
+TTS_VOLUME = 0.9
+TTS_PRECACHE_RESPONSES = True  # pre-render RESPONSES to memory for instant playback
+TTS_CACHE_SIZE = 64  # max phrases kept as cached audio
+TTS_CACHE_MIN_USES = 2  # other phrases are cached after being spoken this many times
+
+# Logging (written by a background thread, see Utils/log.py)
+LOG_LEVEL = "INFO"  # default for everything without its own level below
+LOG_LEVELS = {  # per-subsystem levels: "voice", "voice.recognition", "voice.tts", "voice.commands", "ui", "rl", "startup", "tracing"
+    "voice": "INFO",
+    "rl": "INFO",
+}
+LOG_FILE = None  # also write logs to this file, None for stderr only
+LOG_RATE_LIMIT = (5, 10.0)  # at most this many of the same message per this many seconds (below WARNING)
+
+# Latency tracing
+TRACE_WINDOW = 500  # utterances kept in each rolling latency histogram
+TRACE_SLO_CHECK_EVERY = 50  # completed utterances between p95 checks against LATENCY_SLOS
+TRACE_DUMP_PATH = None  # JSONL file traces are appended to on shutdown, None to disable
+STARTUP_PROFILE_PATH = None  # JSON file the startup timing profile is written to, None to only log it
+# Per-stage limits in milliseconds since capture end; violations are logged and counted
+LATENCY_SLOS = {
+    "recognition_end": 2000,
+    "execution_start": 2500,
+    "end_to_end": 4000,
+}
+
 # Window settings
 MINIMIZED_X = 20
 MINIMIZED_Y = 20
@@ -15,11 +70,17 @@ MAXIMIZED_FACE_SCALE_H = 0.8 # Face height as % of screen height when maximized
 
 
 # Animation settings
-ANIMATION_FPS = 15 # Frames per second for face animation
-GRADIENT_UPDATE_INTERVAL = 50  # milliseconds for border animation speed
+ANIMATION_FPS = 15 # Frames per second of the shared UI animation clock (lowered automatically when frames run over budget)
+GRADIENT_UPDATE_INTERVAL = 50  # milliseconds per degree of border gradient rotation
+
+# Optional JSON file overriding the command sections below ("commands", "responses",
+# "exit_phrases", "app_map"). It is watched while running and edits take effect
+# without a restart. Missing sections fall back to the values in this module.
+COMMANDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "commands.json")
+COMMANDS_RELOAD_INTERVAL = 1.0  # seconds between checks of COMMANDS_FILE
 
 # Commands - SINGLE SOURCE OF TRUTH
-# Use _get_open_command for cross-platform app opening
+# App commands are launched directly (no shell) by Voice/launcher.py
 # Use direct shell commands for specific actions
 COMMANDS = {
     # Web Browse
@@ -27,7 +88,7 @@ COMMANDS = {
     "open google": {"type": "url", "action": "https://google.com"},
     "open fireship": {"type": "url", "action": "https://www.youtube.com/@Fireship"}, # Example specific channel
 
-    # Applications (Use placeholder names, _get_open_command will resolve)
+    # Applications (Use placeholder names, APP_MAP and the launcher will resolve)
     "open chrome": {"type": "app", "action": "Google Chrome"}, # Use exact app name for macOS/Windows if known
     "open browser": {"type": "app", "action": "Google Chrome"}, # Generic alias
     "open safari": {"type": "app", "action": "Safari"},
@@ -74,7 +135,7 @@ RESPONSES = {
 EXIT_PHRASES = ["no thank you", "no thanks", "that's all", "goodbye", "exit", "quit", "nothing else", "nope"]
 
 # --- Platform Specific Mappings ---
-# These help _get_open_command find the right executable/command name
+# These help the launcher find the right executable/application name
 APP_MAP = {
     "darwin": {
         "google chrome": "Google Chrome",
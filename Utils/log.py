@@ -0,0 +1,140 @@
+import sys
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+
+DEFAULT_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets through at most `burst` like records every `interval` seconds.
+
+    Debug records are keyed on the unformatted message, so a loop logging
+    "Heard: %s" with different phrases is limited as one message. Info
+    records are keyed on the formatted message, so distinct events (one
+    "Command recognized" per utterance) always get through and only exact
+    repeats are limited. The first record let through after a quiet period
+    notes how many were dropped. Warnings and above are never limited.
+    """
+
+    def __init__(self, burst=5, interval=10.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows = {}  # (logger, template or message) -> [window start, count, suppressed]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.burst <= 0:
+            return True
+
+        now = time.monotonic()
+        if record.levelno >= logging.INFO:
+            try:
+                message = record.getMessage()
+            except Exception:
+                message = record.msg  # Reported when the handler formats it
+        else:
+            message = record.msg
+        key = (record.name, message)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if len(self._windows) > 4096:
+                    # Forget messages that have gone quiet
+                    self._windows = {k: w for k, w in self._windows.items() if now - w[0] < self.interval}
+            elif window[1] < self.burst:
+                window[1] += 1
+                return True
+            else:
+                window[2] += 1
+                return False
+
+        if suppressed and isinstance(record.args, tuple):
+            msg = str(record.msg) if record.args else str(record.msg).replace("%", "%%")
+            record.msg = msg + " (%d similar messages suppressed)"
+            record.args = record.args + (suppressed,)
+        return True
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the writer thread.
+
+    The stock handler formats every record before queueing it; here the
+    record goes onto the queue as-is, so the calling thread only pays for
+    building the record (and, for info records, the rate limiter's
+    getMessage()). The final formatting happens later, so arguments
+    shouldn't be mutated after the call.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(levels=None, level=None, log_file=None, rate_limit=None, fmt=DEFAULT_FORMAT):
+    """Route all logging through a queue drained by a background writer thread.
+
+    `levels` maps subsystem logger names ("voice", "voice.recognition", "rl",
+    ...) to levels and `level` is the default for everything else; both
+    default to the LOG_* settings in Utils.config. `rate_limit` is a
+    (burst, interval seconds) pair. Calling this again only updates levels.
+    """
+    global _listener
+    try:
+        from Utils import config
+    except ImportError:
+        config = None
+
+    if level is None:
+        level = getattr(config, 'LOG_LEVEL', "INFO")
+    if levels is None:
+        levels = getattr(config, 'LOG_LEVELS', {})
+    if log_file is None:
+        log_file = getattr(config, 'LOG_FILE', None)
+    if rate_limit is None:
+        rate_limit = getattr(config, 'LOG_RATE_LIMIT', (5, 10.0))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for name, subsystem_level in levels.items():
+        logging.getLogger(name).setLevel(subsystem_level)
+
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+
+        formatter = logging.Formatter(fmt)
+        handlers = [logging.StreamHandler(sys.stderr)]
+        if log_file:
+            handlers.append(logging.FileHandler(log_file, encoding="utf-8"))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        queue_handler = _DeferredQueueHandler(queue.SimpleQueue())
+        queue_handler.addFilter(RateLimitFilter(*rate_limit))
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+
+        _listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        # Flush whatever is still queued when the interpreter exits
+        atexit.register(shutdown_logging)
+        return _listener
+
+
+def shutdown_logging():
+    """Stop the writer thread after it has written every queued record"""
+    global _listener
+    with _setup_lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
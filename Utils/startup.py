@@ -0,0 +1,69 @@
+import json
+import time
+import types
+import logging
+import importlib
+import threading
+
+log = logging.getLogger("startup")
+
+
+class StartupProfile:
+    """Records named startup milestones as milliseconds since the profile was created.
+
+    The shared `profile` below is created when this module is first imported,
+    so importing it before anything else in main.py makes it measure from
+    (close to) interpreter start.
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.marks = []
+        self._lock = threading.Lock()
+        self._reported = False
+
+    def mark(self, name):
+        elapsed = (time.perf_counter() - self.t0) * 1000.0
+        with self._lock:
+            self.marks.append({"name": name, "ms": elapsed, "thread": threading.current_thread().name})
+        log.debug("Startup: %s at %.1fms", name, elapsed)
+        return elapsed
+
+    def report(self, path=None):
+        """Log the profile once, optionally writing it to a JSON file"""
+        with self._lock:
+            if self._reported:
+                return
+            self._reported = True
+            marks = sorted(self.marks, key=lambda m: m["ms"])
+
+        lines = [f"  {m['ms']:8.1f}ms  {m['name']} [{m['thread']}]" for m in marks]
+        log.info("Startup profile:\n" + "\n".join(lines))
+        if path:
+            with open(path, "w") as f:
+                json.dump(marks, f, indent=2)
+
+
+profile = StartupProfile()
+
+
+class _LazyModule(types.ModuleType):
+    """Module proxy that performs the real import on first attribute access"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+
+    def __getattr__(self, attr):
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(self.__name__)
+            self.__dict__["_lazy_module"] = module
+            profile.mark(f"import {self.__name__} ({(time.perf_counter() - start) * 1000.0:.0f}ms)")
+        return getattr(module, attr)
+
+
+def lazy_import(name):
+    """Defer importing a heavy module until it is first used"""
+    return _LazyModule(name)
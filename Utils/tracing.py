@@ -0,0 +1,247 @@
+import json
+import time
+import logging
+import itertools
+import threading
+from collections import OrderedDict, deque
+
+log = logging.getLogger("tracing")
+
+# Pipeline stages in the order an utterance normally passes through them
+STAGES = (
+    "speech_start",  # Streamed utterances only
+    "capture_end",
+    "recognition_start",
+    "recognition_end",
+    "match",
+    "execution_start",
+    "execution_end",
+    "signal_delivered",
+)
+
+
+class RollingHistogram:
+    """Keeps the most recent `window` samples and answers percentile queries"""
+
+    def __init__(self, window=500):
+        self.samples = deque(maxlen=window)
+        self.count = 0  # Total samples ever added, not just the ones in the window
+
+    def add(self, value):
+        self.samples.append(value)
+        self.count += 1
+
+    def percentile(self, pct):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": max(self.samples) if self.samples else None,
+        }
+
+
+class LatencyTracer:
+    """Timestamps every pipeline stage of each utterance.
+
+    begin() hands out an utterance id stamped with `capture_end`; later
+    stages are recorded with mark(). Stages are stored as milliseconds since
+    the trace began, all on the perf_counter clock; `started_at` keeps the
+    wall-clock start for lining traces up with logs. Each mark also adds its
+    offset to a rolling histogram named after the stage, and finish() adds
+    the `end_to_end` latency. `slos` maps a histogram name
+    to a millisecond limit; samples over the limit are counted and logged,
+    and every `slo_check_every` completed traces the p95 of each histogram
+    is checked against its limit, with a warning per breach.
+    """
+
+    def __init__(self, window=500, max_open=64, history=1000, slos=None, slo_check_every=50):
+        self.max_open = max_open
+        self.slos = dict(slos or {})
+        self.slo_check_every = slo_check_every
+        self._completed_count = 0
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._open = OrderedDict()  # trace id -> record
+        self._completed = deque(maxlen=history)
+        self._histograms = {}
+        self._window = window
+        self._violations = {}
+        self._pending_delivery = {}  # signal name -> trace ids waiting for that signal to land
+
+    def begin(self, stage="capture_end", **info):
+        """Start a trace for an utterance at `stage` and return its id.
+
+        Streamed utterances start at "speech_start" so stages reached before
+        the phrase ends are still measured.
+        """
+        trace_id = next(self._ids)
+        record = {
+            "id": trace_id,
+            "origin": stage,
+            "started_at": time.time(),
+            "stages": {stage: 0.0},
+            "start": time.perf_counter(),
+        }
+        record.update(info)
+        with self._lock:
+            self._open[trace_id] = record
+            # Utterances that never reach a terminal stage are closed when evicted
+            while len(self._open) > self.max_open:
+                _, evicted = self._open.popitem(last=False)
+                self._complete(evicted)
+        return trace_id
+
+    def mark(self, trace_id, stage, **info):
+        """Record that `trace_id` reached `stage` now"""
+        if trace_id is None:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            record = self._open.get(trace_id)
+            if record is None:
+                return
+            elapsed = (now - record["start"]) * 1000.0
+            record["stages"][stage] = elapsed
+            record.update(info)
+            self._add(stage, elapsed)
+
+    def finish(self, trace_id, **info):
+        """Close a trace and record its end-to-end latency"""
+        if trace_id is None:
+            return
+        with self._lock:
+            record = self._open.pop(trace_id, None)
+            if record is None:
+                return
+            record.update(info)
+            self._complete(record)
+
+    def timestamp(self, trace_id, stage=None):
+        """perf_counter time at which an open trace reached `stage` (default: its origin), or None"""
+        if trace_id is None:
+            return None
+        with self._lock:
+            record = self._open.get(trace_id)
+            if record is None:
+                return None
+            offset = record["stages"].get(stage or record["origin"])
+            return None if offset is None else record["start"] + offset / 1000.0
+
+    def get(self, trace_id, key, default=None):
+        """A field of an open trace (as passed to begin(), mark() or finish()), or `default`"""
+        if trace_id is None:
+            return default
+        with self._lock:
+            record = self._open.get(trace_id)
+            return default if record is None else record.get(key, default)
+
+    def expect_delivery(self, trace_id, signal):
+        """Note that UI signal `signal` has been emitted for `trace_id`.
+
+        Deliveries are paired per signal name, so a show_window landing
+        can't close the trace waiting on a minimize_window. None stands for
+        an emission that belongs to no trace; its delivery is consumed
+        without closing anything, so later ones stay paired.
+        """
+        with self._lock:
+            self._pending_delivery.setdefault(signal, deque()).append(trace_id)
+
+    def delivered(self, signal):
+        """Called on the UI side when `signal` lands; closes the oldest trace waiting on it"""
+        with self._lock:
+            pending = self._pending_delivery.get(signal)
+            if not pending:
+                return
+            trace_id = pending.popleft()
+        self.mark(trace_id, "signal_delivered")
+        self.finish(trace_id)
+
+    def stats(self):
+        """Rolling latency percentiles (ms) and SLO violation counts per histogram"""
+        with self._lock:
+            result = {name: hist.summary() for name, hist in self._histograms.items()}
+            for name, summary in result.items():
+                if name in self.slos:
+                    summary["slo_ms"] = self.slos[name]
+                    summary["slo_violations"] = self._violations.get(name, 0)
+            return result
+
+    def records(self):
+        """Completed traces, oldest first"""
+        with self._lock:
+            return [self._export(record) for record in self._completed]
+
+    def check_slos(self, pct=95):
+        """Return {name: (observed, limit)} for histograms whose percentile exceeds its SLO"""
+        with self._lock:
+            return self._failing_slos(pct)
+
+    def report_slos(self, pct=95):
+        """check_slos(), logging a warning for each breached SLO"""
+        with self._lock:
+            failing = self._failing_slos(pct)
+            self._log_breaches(failing, pct)
+        return failing
+
+    def dump_jsonl(self, path, include_open=True):
+        """Append completed (and optionally in-flight) traces to a JSONL file"""
+        with self._lock:
+            records = list(self._completed)
+            if include_open:
+                records.extend(self._open.values())
+            records = [self._export(record) for record in records]
+        with open(path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        return len(records)
+
+    def _complete(self, record):
+        """Finalize a record; caller holds the lock"""
+        stages = record["stages"]
+        end_to_end = max(stages.values()) - stages[record["origin"]]
+        record["end_to_end_ms"] = end_to_end
+        self._add("end_to_end", end_to_end)
+        self._completed.append(record)
+        self._completed_count += 1
+        if self.slo_check_every and self._completed_count % self.slo_check_every == 0:
+            self._log_breaches(self._failing_slos(95), 95)
+
+    def _failing_slos(self, pct):
+        """check_slos(); caller holds the lock"""
+        failing = {}
+        for name, limit in self.slos.items():
+            hist = self._histograms.get(name)
+            observed = hist.percentile(pct) if hist else None
+            if observed is not None and observed > limit:
+                failing[name] = (observed, limit)
+        return failing
+
+    @staticmethod
+    def _log_breaches(failing, pct):
+        for name, (observed, limit) in failing.items():
+            log.warning("Latency SLO breached for '%s': p%s %.0fms > %sms", name, pct, observed, limit)
+
+    def _add(self, name, value):
+        """Add a sample to a histogram; caller holds the lock"""
+        hist = self._histograms.get(name)
+        if hist is None:
+            hist = self._histograms[name] = RollingHistogram(self._window)
+        hist.add(value)
+
+        limit = self.slos.get(name)
+        if limit is not None and value > limit:
+            self._violations[name] = self._violations.get(name, 0) + 1
+            log.warning("Latency SLO exceeded for '%s': %.0fms > %sms", name, value, limit)
+
+    @staticmethod
+    def _export(record):
+        return {key: value for key, value in record.items() if key != "start"}
@@ -0,0 +1,184 @@
+import subprocess
+import threading
+import itertools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtCore import QObject, pyqtSignal
+
+log = logging.getLogger("voice.commands")
+
+
+class CommandCancelled(Exception):
+    """Raised inside a worker when its command has been cancelled"""
+
+
+class CommandExecutor(QObject):
+    """Runs slow commands on a bounded worker pool so the listener never blocks"""
+
+    # Signals delivering command lifecycle to the Qt side (id, command name[, success])
+    command_started = pyqtSignal(int, str)
+    command_finished = pyqtSignal(int, str, bool)
+    command_cancelled = pyqtSignal(int, str)
+
+    def __init__(self, max_workers=4, parent=None):
+        super().__init__(parent)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="command")
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._local = threading.local()  # Holds the command id of the running worker
+
+        # Bookkeeping for in-flight commands, all guarded by self._lock
+        self._futures = {}
+        self._processes = {}
+        self._timers = {}
+        self._cancelled = set()
+
+    def submit(self, name, fn, *args, timeout=None, **kwargs):
+        """Queue fn(*args, **kwargs) on the pool and return its Future.
+
+        The returned future carries a `command_id` attribute that can be passed
+        to cancel(). When `timeout` is given the command is cancelled once it
+        has been running for that many seconds.
+        """
+        command_id = next(self._ids)
+
+        # Register under the lock so a fast worker cannot finish before we track it
+        with self._lock:
+            future = self._pool.submit(self._run, command_id, name, timeout, fn, args, kwargs)
+            future.command_id = command_id
+            self._futures[command_id] = future
+
+        future.add_done_callback(lambda f: self._on_done(command_id, name, f))
+        log.debug("Queued command #%s '%s'", command_id, name)
+        return future
+
+    def cancel(self, command_id):
+        """Cancel a queued or running command. Returns True if it was still live."""
+        with self._lock:
+            future = self._futures.get(command_id)
+            if future is None:
+                return False
+            self._cancelled.add(command_id)
+            process = self._processes.get(command_id)
+
+        # Commands still waiting for a worker never start
+        if future.cancel():
+            return True
+
+        # Running commands are stopped by killing their child process, if any
+        if process is not None and process.poll() is None:
+            log.info("Killing process for cancelled command #%s", command_id)
+            try:
+                process.kill()
+            except OSError as e:
+                log.error("Failed to kill process for command #%s: %s", command_id, e)
+        return True
+
+    def cancel_all(self):
+        """Cancel every queued and running command"""
+        with self._lock:
+            command_ids = list(self._futures)
+        for command_id in command_ids:
+            self.cancel(command_id)
+
+    def pending(self):
+        """Return the ids of commands that have not finished yet"""
+        with self._lock:
+            return list(self._futures)
+
+    def shutdown(self, wait=False):
+        """Cancel outstanding work and stop the worker pool"""
+        self.cancel_all()
+        self._pool.shutdown(wait=wait)
+
+    def check_cancelled(self):
+        """Raise CommandCancelled if the calling worker's command was cancelled"""
+        command_id = getattr(self._local, "command_id", None)
+        with self._lock:
+            cancelled = command_id in self._cancelled
+        if cancelled:
+            raise CommandCancelled(f"Command #{command_id} was cancelled")
+
+    def run_process(self, args, shell=False, timeout=None, check=False):
+        """subprocess.run replacement for use inside submitted commands.
+
+        The child process is registered with the calling command so cancel()
+        and command timeouts can kill it. Raises the same TimeoutExpired and
+        CalledProcessError exceptions as subprocess.run.
+        """
+        self.check_cancelled()
+        command_id = getattr(self._local, "command_id", None)
+
+        process = subprocess.Popen(
+            args,
+            shell=shell,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        with self._lock:
+            if command_id is not None:
+                self._processes[command_id] = process
+
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise
+        finally:
+            with self._lock:
+                self._processes.pop(command_id, None)
+
+        # A kill from cancel() shows up as a normal (failed) exit, report it as cancellation
+        self.check_cancelled()
+
+        if check and process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, args, output=stdout, stderr=stderr)
+        return subprocess.CompletedProcess(args, process.returncode, stdout, stderr)
+
+    def _run(self, command_id, name, timeout, fn, args, kwargs):
+        """Worker entry point wrapping a single command"""
+        self._local.command_id = command_id
+        if timeout is not None:
+            timer = threading.Timer(timeout, self._on_timeout, args=(command_id, name, timeout))
+            timer.daemon = True
+            with self._lock:
+                self._timers[command_id] = timer
+            timer.start()
+
+        try:
+            self.check_cancelled()
+            self.command_started.emit(command_id, name)
+            return fn(*args, **kwargs)
+        finally:
+            self._local.command_id = None
+
+    def _on_timeout(self, command_id, name, timeout):
+        log.warning("Command #%s '%s' exceeded %ss, cancelling", command_id, name, timeout)
+        self.cancel(command_id)
+
+    def _on_done(self, command_id, name, future):
+        with self._lock:
+            self._futures.pop(command_id, None)
+            self._processes.pop(command_id, None)
+            timer = self._timers.pop(command_id, None)
+            cancelled = command_id in self._cancelled
+            self._cancelled.discard(command_id)
+
+        if timer is not None:
+            timer.cancel()
+
+        if cancelled or future.cancelled():
+            log.info("Command #%s '%s' cancelled", command_id, name)
+            self.command_cancelled.emit(command_id, name)
+            self.command_finished.emit(command_id, name, False)
+            return
+
+        error = future.exception()
+        if error is not None:
+            log.error("Command #%s '%s' raised: %s", command_id, name, error)
+            self.command_finished.emit(command_id, name, False)
+            return
+
+        self.command_finished.emit(command_id, name, bool(future.result()))
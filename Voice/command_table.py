@@ -0,0 +1,137 @@
+import os
+import json
+import logging
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+log = logging.getLogger("voice.commands")
+
+# A command with its action resolved for the current OS.
+# `action` is the configured value, `resolved` is what actually runs here:
+# the shell string for this OS, the mapped app name, or the URL/text as-is.
+CommandSpec = namedtuple("CommandSpec", ["phrase", "type", "action", "resolved"])
+
+
+class CommandTable:
+    """Immutable, precompiled command configuration for one OS.
+
+    Built once per configuration load; readers grab a reference and use it
+    for a whole utterance, so a reload never changes a table in use.
+    """
+
+    def __init__(self, commands, responses, exit_phrases, app_map, current_os, source=None):
+        self.current_os = current_os
+        self.source = source
+        self.app_map = MappingProxyType({k.lower(): v for k, v in app_map.get(current_os, {}).items()})
+        self.responses = MappingProxyType(dict(responses))
+        self.exit_phrases = tuple(phrase.lower() for phrase in exit_phrases)
+
+        specs = {}
+        app_names = {}
+        for phrase, details in commands.items():
+            phrase = phrase.lower()
+            command_type = details.get("type")
+            action = details.get("action")
+            resolved = action
+            if command_type in ("shell", "shell_speak") and isinstance(action, dict):
+                resolved = action.get(current_os)
+            elif command_type == "app":
+                resolved = self.app_map.get(action.lower(), action)
+                app_names[action] = resolved
+            specs[phrase] = CommandSpec(phrase, command_type, action, resolved)
+
+        self.commands = MappingProxyType(specs)
+        self.app_names = MappingProxyType(app_names)
+
+        # Longest phrases first so "open google" doesn't shadow longer matches
+        self.phrases = tuple(sorted(specs, key=len, reverse=True))
+        # Phrases that are the start of a longer phrase can't be trusted mid-utterance
+        self.prefix_phrases = frozenset(
+            phrase for phrase in self.phrases
+            if any(other != phrase and other.startswith(phrase) for other in self.phrases)
+        )
+
+    def match(self, text):
+        """Return the longest command phrase contained in text, or None"""
+        for phrase in self.phrases:
+            if phrase in text:
+                return phrase
+        return None
+
+    def is_exit(self, text):
+        return any(phrase in text for phrase in self.exit_phrases)
+
+    def resolve_app(self, app_name):
+        """Mapped application name for this OS"""
+        return self.app_names.get(app_name) or self.app_map.get(app_name.lower(), app_name)
+
+
+def load_command_table(config, current_os, path=None):
+    """Compile a CommandTable from the JSON file at `path`, falling back to `config`.
+
+    The file may define any of "commands", "responses", "exit_phrases" and
+    "app_map" with the same shape as the config module; missing sections use
+    the config module's values. Raises on unreadable or invalid files.
+    """
+    data = {}
+    if path and os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError(f"{path} must contain a JSON object")
+
+    return CommandTable(
+        commands=data.get("commands", getattr(config, "COMMANDS", {})),
+        responses=data.get("responses", getattr(config, "RESPONSES", {})),
+        exit_phrases=data.get("exit_phrases", getattr(config, "EXIT_PHRASES", [])),
+        app_map=data.get("app_map", getattr(config, "APP_MAP", {})),
+        current_os=current_os,
+        source=path if data else None
+    )
+
+
+class CommandConfigWatcher:
+    """Polls the command file and hands freshly compiled tables to `on_reload`.
+
+    Compilation happens on the watcher thread; a file that fails to load is
+    logged and the previous table stays in service.
+    """
+
+    def __init__(self, path, config, current_os, on_reload, interval=1.0):
+        self.path = path
+        self.config = config
+        self.current_os = current_os
+        self.on_reload = on_reload
+        self.interval = interval
+        self._stop = threading.Event()
+        self._signature = self._stat()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="command-config", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            signature = self._stat()
+            if signature == self._signature:
+                continue
+            self._signature = signature
+            try:
+                table = load_command_table(self.config, self.current_os, self.path)
+            except Exception as e:
+                log.error("Failed to reload commands from %s, keeping previous table: %s", self.path, e)
+                continue
+            log.info("Reloaded %s commands from %s", len(table.commands), self.path if signature else 'config')
+            self.on_reload(table)
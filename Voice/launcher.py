@@ -0,0 +1,124 @@
+import os
+import shutil
+import logging
+import threading
+import subprocess
+from collections import namedtuple
+
+log = logging.getLogger("voice.commands")
+
+# How to start an application: `argv` for a direct spawn, or `uri` for
+# os.startfile (Windows URI schemes and registered apps). Both are None when
+# the application could not be found.
+LaunchTarget = namedtuple("LaunchTarget", ["app_name", "argv", "uri"])
+
+
+def _looks_like_uri(name):
+    """True for URI schemes such as 'ms-settings:' but not for drive paths like 'C:\\...'"""
+    scheme, sep, _ = name.partition(":")
+    return bool(sep) and len(scheme) > 1 and scheme.replace("-", "").replace("+", "").replace(".", "").isalnum()
+
+
+class AppLauncher:
+    """Starts applications without a shell, from a cache of resolved executables.
+
+    Mapped application names are resolved once to absolute paths (or to
+    `open -a` on macOS, or a URI on Windows) and cached; the whole cache is
+    dropped when PATH changes. Applications that weren't found are looked up
+    again on every launch, and an entry whose executable has disappeared is
+    dropped when spawning it fails. Launched processes are detached and launch()
+    returns as soon as they have been spawned.
+    """
+
+    def __init__(self, current_os):
+        self.current_os = current_os
+        self._cache = {}
+        self._path = os.environ.get("PATH", "")
+        self._lock = threading.Lock()
+
+    def resolve(self, app_name):
+        """LaunchTarget for a mapped application name, from the cache when possible"""
+        with self._lock:
+            path = os.environ.get("PATH", "")
+            if path != self._path:
+                log.info("PATH changed, clearing resolved applications")
+                self._cache.clear()
+                self._path = path
+            target = self._cache.get(app_name)
+        if target is not None:
+            return target
+
+        target = self._resolve(app_name, path)
+        with self._lock:
+            # Don't cache a miss (it may be installed later), nor a result
+            # computed against a PATH that has since changed
+            if self._path == path and (target.argv is not None or target.uri is not None):
+                self._cache[app_name] = target
+        return target
+
+    def prewarm(self, app_names):
+        """Resolve applications ahead of their first launch"""
+        for app_name in app_names:
+            self.resolve(app_name)
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+
+    def launch(self, app_name):
+        """Start an application detached from this process.
+
+        Returns True once it has been spawned; raises FileNotFoundError if the
+        application can't be resolved and OSError if spawning fails.
+        """
+        target = self.resolve(app_name)
+        if target.uri is not None:
+            os.startfile(target.uri)
+            return True
+        if target.argv is None:
+            raise FileNotFoundError(f"Application '{app_name}' not found on PATH")
+
+        kwargs = {}
+        if self.current_os == "windows":
+            kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs["start_new_session"] = True  # Keeps running if the assistant exits
+        try:
+            subprocess.Popen(
+                target.argv,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                close_fds=True,
+                **kwargs
+            )
+        except FileNotFoundError:
+            # Uninstalled or moved since it was resolved; look it up afresh next time
+            self._forget(app_name, target)
+            raise
+        return True
+
+    def _forget(self, app_name, target):
+        with self._lock:
+            if self._cache.get(app_name) is target:
+                del self._cache[app_name]
+
+    def _resolve(self, app_name, path):
+        if self.current_os == "darwin":
+            # Application bundles are opened by name through LaunchServices
+            opener = shutil.which("open", path=path) or "/usr/bin/open"
+            return LaunchTarget(app_name, [opener, "-a", app_name], None)
+
+        if self.current_os == "windows":
+            if _looks_like_uri(app_name):
+                return LaunchTarget(app_name, None, app_name)
+            executable = shutil.which(app_name, path=path)
+            # Registered apps (App Paths) aren't on PATH; the shell resolves them like `start` did
+            if executable is None:
+                return LaunchTarget(app_name, None, app_name)
+            return LaunchTarget(app_name, [executable], None)
+
+        executable = shutil.which(app_name, path=path)
+        if executable is None:
+            log.warning("Application '%s' not found on PATH", app_name)
+        return LaunchTarget(app_name, [executable] if executable else None, None)
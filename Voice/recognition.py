@@ -0,0 +1,339 @@
+import json
+import time
+import audioop
+import hashlib
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from Utils.startup import lazy_import
+from Utils.tracing import RollingHistogram
+
+log = logging.getLogger("voice.recognition")
+
+sr = lazy_import("speech_recognition")  # Heavy import, deferred until first use
+
+
+class RecognitionBackend:
+    """Base class for speech-to-text engines used by RecognitionPool.
+
+    recognize() returns a lowercase transcript for an sr.AudioData. It raises
+    sr.UnknownValueError when the audio holds no intelligible speech and
+    sr.RequestError when the engine itself fails, which triggers failover.
+    """
+    name = "backend"
+
+    def recognize(self, audio):
+        raise NotImplementedError
+
+    def open_stream(self, sample_rate, sample_width):
+        """Return a RecognitionStream for incremental recognition, or None if unsupported"""
+        return None
+
+
+class RecognitionStream:
+    """Incremental recognition of a single utterance.
+
+    feed() takes raw audio frames as they are captured and returns the
+    current partial hypothesis (or None if it has not changed); finish()
+    returns the final transcript with the same errors as recognize().
+    """
+
+    def feed(self, data):
+        raise NotImplementedError
+
+    def finish(self):
+        raise NotImplementedError
+
+
+class GoogleBackend(RecognitionBackend):
+    """Google Web Speech API through speech_recognition"""
+    name = "google"
+
+    def __init__(self, language="en-US", timeout=None):
+        self.language = language
+        self.recognizer = sr.Recognizer()
+        # Bound the HTTP request so a stalled service fails over instead of hanging
+        self.recognizer.operation_timeout = timeout
+
+    def recognize(self, audio):
+        return self.recognizer.recognize_google(audio, language=self.language).lower()
+
+
+class VoskBackend(RecognitionBackend):
+    """Offline recognition with a local Vosk/Kaldi model"""
+    name = "vosk"
+    sample_rate = 16000
+
+    def __init__(self, model_path):
+        try:
+            import vosk
+        except ImportError as e:
+            raise sr.RequestError("Offline recognition requires the 'vosk' package") from e
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self.model = vosk.Model(model_path)
+
+    def recognize(self, audio):
+        recognizer = self._vosk.KaldiRecognizer(self.model, self.sample_rate)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2))
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+        if not text:
+            raise sr.UnknownValueError()
+        return text.lower()
+
+    def open_stream(self, sample_rate, sample_width):
+        return VoskStream(self._vosk.KaldiRecognizer(self.model, self.sample_rate),
+                          sample_rate, sample_width, self.sample_rate)
+
+
+class VoskStream(RecognitionStream):
+    """Feeds microphone frames to a KaldiRecognizer, converting to 16-bit model rate"""
+
+    def __init__(self, recognizer, sample_rate, sample_width, model_rate):
+        self.recognizer = recognizer
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.model_rate = model_rate
+        self._ratecv_state = None
+        self._last_partial = ""
+        self._committed = []  # Text of segments Kaldi has already finalized mid-utterance
+
+    def feed(self, data):
+        if self.sample_width != 2:
+            data = audioop.lin2lin(data, self.sample_width, 2)
+        if self.sample_rate != self.model_rate:
+            data, self._ratecv_state = audioop.ratecv(data, 2, 1, self.sample_rate, self.model_rate,
+                                                      self._ratecv_state)
+
+        if self.recognizer.AcceptWaveform(data):
+            segment = json.loads(self.recognizer.Result()).get("text", "")
+            if segment:
+                self._committed.append(segment)
+            partial = ""
+        else:
+            partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+
+        text = " ".join(self._committed + ([partial] if partial else [])).lower()
+        if text == self._last_partial:
+            return None
+        self._last_partial = text
+        return text
+
+    def finish(self):
+        tail = json.loads(self.recognizer.FinalResult()).get("text", "")
+        text = " ".join(self._committed + ([tail] if tail else [])).lower()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class StaticBackend(RecognitionBackend):
+    """Deterministic local stand-in that looks transcripts up instead of recognizing.
+
+    Transcripts are matched by the audio's raw bytes (see add()), falling back
+    to a FIFO script of texts. An optional delay simulates engine latency and
+    `fail=True` makes every call raise sr.RequestError to exercise failover.
+    """
+    name = "static"
+
+    def __init__(self, transcripts=None, script=None, delay=0.0, fail=False):
+        self._lock = threading.Lock()
+        self.transcripts = {}
+        self.script = deque(script or [])
+        self.delay = delay
+        self.fail = fail
+        for audio, text in (transcripts or {}).items():
+            self.add(audio, text)
+
+    @staticmethod
+    def audio_key(audio):
+        """Stable lookup key for an sr.AudioData (or raw bytes)"""
+        data = audio if isinstance(audio, bytes) else audio.get_raw_data()
+        return hashlib.sha1(data).hexdigest()
+
+    def add(self, audio, text):
+        with self._lock:
+            self.transcripts[self.audio_key(audio)] = text
+
+    def recognize(self, audio):
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise sr.RequestError("Static backend configured to fail")
+
+        with self._lock:
+            text = self.transcripts.get(self.audio_key(audio))
+            if text is None and self.script:
+                text = self.script.popleft()
+        if not text:
+            raise sr.UnknownValueError()
+        return text.lower()
+
+    def open_stream(self, sample_rate, sample_width, frames_per_word=5):
+        """Stream the next scripted transcript, revealing one word every few feeds"""
+        with self._lock:
+            text = self.script.popleft() if self.script else ""
+        return StaticStream(text, frames_per_word, fail=self.fail)
+
+
+class StaticStream(RecognitionStream):
+    """Deterministic partial hypotheses for StaticBackend"""
+
+    def __init__(self, text, frames_per_word, fail=False):
+        self.words = text.lower().split()
+        self.frames_per_word = frames_per_word
+        self.fail = fail
+        self._frames = 0
+        self._shown = 0
+
+    def feed(self, data):
+        if self.fail:
+            raise sr.RequestError("Static backend configured to fail")
+        self._frames += 1
+        shown = min(len(self.words), self._frames // self.frames_per_word)
+        if shown == self._shown:
+            return None
+        self._shown = shown
+        return " ".join(self.words[:shown])
+
+    def finish(self):
+        if self.fail:
+            raise sr.RequestError("Static backend configured to fail")
+        if not self.words:
+            raise sr.UnknownValueError()
+        return " ".join(self.words)
+
+
+def create_backends(names, vosk_model_path=None, timeout=None):
+    """Build the configured backends in priority order, skipping unavailable ones"""
+    backends = []
+    for name in names:
+        try:
+            if name == "google":
+                backends.append(GoogleBackend(timeout=timeout))
+            elif name == "vosk":
+                if not vosk_model_path:
+                    log.warning("Vosk backend requested but VOSK_MODEL_PATH is not set, skipping")
+                    continue
+                backends.append(VoskBackend(vosk_model_path))
+            elif name == "static":
+                backends.append(StaticBackend())
+            else:
+                log.warning("Unknown recognition backend '%s', skipping", name)
+        except Exception as e:
+            log.error("Failed to initialize recognition backend '%s': %s", name, e)
+    return backends
+
+
+class BackendHealth:
+    """Rolling latency and failure record for one backend"""
+
+    def __init__(self, window):
+        self.latencies = RollingHistogram(window)
+        self.failures = 0
+        self.down_until = 0.0  # monotonic time before which the backend is demoted
+
+
+class RecognitionPool:
+    """Transcribes captured utterances concurrently on a worker pool.
+
+    Backends are tried in priority order. A backend that errors, or whose
+    call exceeds `slow_threshold` seconds, is demoted for `cooldown` seconds
+    so later utterances go to the next backend first.
+    """
+
+    def __init__(self, backends, max_workers=2, slow_threshold=3.0, cooldown=30.0, latency_window=50):
+        if not backends:
+            raise ValueError("RecognitionPool needs at least one backend")
+        self.backends = list(backends)
+        self.slow_threshold = slow_threshold
+        self.cooldown = cooldown
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="recognition")
+        self._lock = threading.Lock()
+        self._health = {backend.name: BackendHealth(latency_window) for backend in self.backends}
+
+    def submit(self, audio, on_start=None):
+        """Queue audio for recognition and return a Future resolving to the transcript.
+
+        `on_start` is called on the worker thread just before recognition begins.
+        """
+        return self._pool.submit(self._run, audio, on_start)
+
+    def _run(self, audio, on_start):
+        if on_start is not None:
+            on_start()
+        return self.recognize(audio)
+
+    def recognize(self, audio):
+        """Recognize audio on the calling thread, failing over between backends"""
+        last_error = None
+        for backend in self._ranked_backends():
+            start = time.monotonic()
+            try:
+                text = backend.recognize(audio)
+            except sr.UnknownValueError:
+                # The engine worked, the audio was just unintelligible
+                self._record(backend, time.monotonic() - start, failed=False)
+                raise
+            except Exception as e:
+                self._record(backend, time.monotonic() - start, failed=True)
+                log.warning("Recognition backend '%s' failed: %s", backend.name, e)
+                last_error = e
+                continue
+
+            self._record(backend, time.monotonic() - start, failed=False)
+            return text
+
+        if isinstance(last_error, sr.RequestError):
+            raise last_error
+        raise sr.RequestError(f"All recognition backends failed: {last_error}")
+
+    def open_stream(self, sample_rate, sample_width):
+        """Open a stream on the best healthy backend that supports streaming, or return None"""
+        for backend in self._ranked_backends():
+            try:
+                stream = backend.open_stream(sample_rate, sample_width)
+            except Exception as e:
+                log.warning("Recognition backend '%s' failed to open a stream: %s", backend.name, e)
+                continue
+            if stream is not None:
+                return stream
+        return None
+
+    def stats(self):
+        """Per-backend call counts and latency percentiles (seconds)"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {
+                    "calls": health.latencies.count,
+                    "failures": health.failures,
+                    "p50": health.latencies.percentile(50),
+                    "p95": health.latencies.percentile(95),
+                    "demoted": health.down_until > now,
+                }
+                for name, health in self._health.items()
+            }
+
+    def shutdown(self, wait=False):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _ranked_backends(self):
+        """Healthy backends in priority order, then demoted ones as a last resort"""
+        now = time.monotonic()
+        with self._lock:
+            healthy = [b for b in self.backends if self._health[b.name].down_until <= now]
+            demoted = [b for b in self.backends if self._health[b.name].down_until > now]
+        return healthy + demoted
+
+    def _record(self, backend, latency, failed):
+        with self._lock:
+            health = self._health[backend.name]
+            health.latencies.add(latency)
+            if failed:
+                health.failures += 1
+            if failed or latency > self.slow_threshold:
+                if len(self.backends) > 1:
+                    log.info("Demoting recognition backend '%s' for %ss (latency=%.2fs, failed=%s)", backend.name, self.cooldown, latency, failed)
+                health.down_until = time.monotonic() + self.cooldown
@@ -0,0 +1,267 @@
+"""Offline replay harness and throughput benchmark for VoiceController.
+
+Feeds a corpus of WAV files through the real capture endpointing and state
+machine (wake word, command, _process_command) without a microphone, a
+recognition service or any side effects, then reports per-stage latency,
+utterances/sec and match accuracy.
+
+The corpus is a JSONL manifest, one utterance per line, in spoken order:
+
+    {"wav": "clips/wake.wav", "transcript": "hey jarvis", "expect": "wake"}
+    {"wav": "clips/chrome.wav", "transcript": "open chrome", "expect": "open chrome"}
+
+`wav` is relative to the manifest. `expect` is a command phrase, "wake",
+"exit", or null when nothing should match. A small regression corpus lives
+in test/voice_corpus; run from the repository root:
+
+    python -m Voice.replay test/voice_corpus/manifest.jsonl --min-accuracy 1.0
+    python -m Voice.replay test/voice_corpus/manifest.jsonl --repeat 50 --recognition-delay 0.2
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from functools import partial
+import speech_recognition as sr
+from PyQt5.QtCore import Qt
+from .recognition import StaticBackend
+from Utils.log import setup_logging
+from Utils.tracing import LatencyTracer
+from .voice_control import VoiceController, ListeningState
+
+log = logging.getLogger("voice.replay")
+
+
+class FileAudioSource:
+    """Loads corpus WAV files and captures them like the microphone would"""
+
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+
+    def capture(self, path, timeout, phrase_time_limit):
+        """Run the recognizer's phrase endpointing over a WAV file"""
+        with sr.AudioFile(path) as source:
+            return self.recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
+
+
+class ReplayVoiceController(VoiceController):
+    """VoiceController with stubbed command execution and no TTS.
+
+    Commands are recorded instead of run; `execution_delay` seconds are
+    spent per command to model launch cost. Only the commands in
+    Utils/config.py are used: the command file isn't read or watched and
+    apps aren't resolved against PATH, so a replay doesn't depend on the host.
+    """
+
+    def __init__(self, recognition_backends, execution_delay=0.0):
+        self.execution_delay = execution_delay
+        self.executed = []
+        super().__init__(recognition_backends=recognition_backends)
+
+    def _init_config(self):
+        super()._init_config()
+        self.commands_file = None  # Also keeps CommandConfigWatcher from starting
+        self.command_table = self._load_command_table()
+
+    def _start_app_prewarm(self):
+        pass
+
+    def _init_tts_engine(self):
+        return True
+
+    def _record(self, kind, action):
+        self.executed.append((kind, action))
+        if self.execution_delay:
+            time.sleep(self.execution_delay)
+        return True
+
+    def _execute_url_command(self, url):
+        return self._record("url", url)
+
+    def _execute_app_command(self, app_name):
+        return self._record("app", app_name)
+
+    def _execute_shell_command(self, command_type, action):
+        return self._record(command_type, action)
+
+    def _execute_speak_command(self, text):
+        return self._record("speak", text)
+
+
+def load_manifest(path):
+    base = os.path.dirname(os.path.abspath(path))
+    entries = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            entry["wav"] = os.path.join(base, entry["wav"])
+            entries.append(entry)
+    return entries
+
+
+def _outcome(record):
+    """Reduce a finished trace to what the harness compares against `expect`"""
+    if record.get("command"):
+        return record["command"]
+    if record.get("outcome") == "wake_word":
+        return "wake"
+    if record.get("outcome") == "exit":
+        return "exit"
+    return None
+
+
+class ReplayHarness:
+    """Drives a ReplayVoiceController through a manifest of utterances"""
+
+    def __init__(self, entries, recognition_delay=0.0, execution_delay=0.0, sequential=False, repeat=1):
+        self.entries = entries
+        self.sequential = sequential
+        self.repeat = repeat
+        self.backend = StaticBackend(delay=recognition_delay)
+        self.controller = ReplayVoiceController([self.backend], execution_delay=execution_delay)
+        self.controller.recognition_ready.result()
+        self.source = FileAudioSource(self.controller.recognizer)
+
+        # Keep every trace of the run, however long the corpus
+        total = len(entries) * repeat
+        tracer = LatencyTracer(max_open=total + 1, history=total + 1, slos=self.controller.latency_slos)
+        self.controller.tracer = tracer
+
+        # No Qt event loop here, so stand in for MainWindow receiving the signals;
+        # Direct, since a queued call would never be delivered
+        for name in ("show_window", "minimize_window", "close_window"):
+            getattr(self.controller, name).connect(partial(tracer.delivered, name), Qt.DirectConnection)
+
+    def run(self, timeout=60.0):
+        """Replay the corpus `repeat` times, each pass starting from the wake-word state"""
+        trace_ids = []
+        start = time.perf_counter()
+        for _ in range(self.repeat):
+            # A pass usually ends with an exit phrase, which stops listening
+            self.controller.state = ListeningState.WAIT_WAKE_WORD
+            self._replay_pass(trace_ids, timeout)
+        elapsed = time.perf_counter() - start
+
+        return self._report(self.entries * self.repeat, trace_ids, elapsed)
+
+    def _replay_pass(self, trace_ids, timeout):
+        controller = self.controller
+        pass_ids = []
+        for entry in self.entries:
+            # Same timeouts the listen loop uses for the current state
+            if controller.state == ListeningState.WAIT_COMMAND:
+                timeout_s, limit = controller.voice_timeout + 3, controller.voice_phrase_limit + 4
+            else:
+                timeout_s, limit = controller.voice_timeout, controller.voice_phrase_limit
+            try:
+                audio = self.source.capture(entry["wav"], timeout_s, limit)
+            except sr.WaitTimeoutError:
+                # Nothing above the energy threshold, the microphone would have heard nothing
+                log.warning("No speech detected in %s", entry["wav"])
+                pass_ids.append(None)
+                continue
+
+            self.backend.add(audio, entry.get("transcript", ""))
+            pass_ids.append(controller._submit_audio(audio))
+            if self.sequential:
+                self._wait_for(pass_ids, timeout)
+        # Passes don't overlap, so each one starts from a known state
+        self._wait_for(pass_ids, timeout)
+        trace_ids.extend(pass_ids)
+
+    def _wait_for(self, trace_ids, timeout):
+        deadline = time.monotonic() + timeout
+        wanted = {trace_id for trace_id in trace_ids if trace_id is not None}
+        while time.monotonic() < deadline:
+            done = {record["id"] for record in self.controller.tracer.records()}
+            if wanted <= done:
+                return
+            time.sleep(0.005)
+        log.warning("Replay timed out with %d utterances unfinished", len(wanted - done))
+
+    def _report(self, entries, trace_ids, elapsed):
+        records = {record["id"]: record for record in self.controller.tracer.records()}
+        results = []
+        correct = 0
+        for entry, trace_id in zip(entries, trace_ids):
+            record = records.get(trace_id, {})
+            got = _outcome(record)
+            ok = got == entry.get("expect")
+            correct += ok
+            results.append({"wav": entry["wav"], "expect": entry.get("expect"), "got": got, "ok": ok})
+
+        count = len(entries)
+        return {
+            "utterances": count,
+            "elapsed_s": elapsed,
+            "utterances_per_s": count / elapsed if elapsed else None,
+            "accuracy": correct / count if count else None,
+            "stages_ms": self.controller.tracer.stats(),
+            "slo_breaches": self.controller.tracer.report_slos(),
+            "recognition": self.controller.recognition_pool.stats(),
+            "results": results,
+        }
+
+    def close(self):
+        self.controller.executor.shutdown()
+        self.controller.recognition_pool.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a WAV corpus through VoiceController")
+    parser.add_argument("manifest", help="JSONL manifest of utterances")
+    parser.add_argument("--recognition-delay", type=float, default=0.0, help="simulated seconds per recognition")
+    parser.add_argument("--execution-delay", type=float, default=0.0, help="simulated seconds per command")
+    parser.add_argument("--sequential", action="store_true", help="wait for each utterance before the next")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the corpus this many times")
+    parser.add_argument("--output", help="write the full JSON report here")
+    parser.add_argument("--min-accuracy", type=float, help="fail if match accuracy is below this")
+    parser.add_argument("--max-p95-ms", type=float, help="fail if end-to-end p95 latency exceeds this")
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    entries = load_manifest(args.manifest)
+    harness = ReplayHarness(
+        entries,
+        recognition_delay=args.recognition_delay,
+        execution_delay=args.execution_delay,
+        sequential=args.sequential,
+        repeat=args.repeat
+    )
+    try:
+        report = harness.run()
+    finally:
+        harness.close()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    print(f"Utterances:      {report['utterances']}")
+    print(f"Throughput:      {report['utterances_per_s']:.2f} utterances/s")
+    print(f"Match accuracy:  {report['accuracy']:.1%}")
+    for stage, summary in report["stages_ms"].items():
+        print(f"  {stage:<18} p50={summary['p50']:.1f}ms p95={summary['p95']:.1f}ms max={summary['max']:.1f}ms")
+    for result in report["results"]:
+        if not result["ok"]:
+            print(f"  MISMATCH {result['wav']}: expected {result['expect']!r}, got {result['got']!r}")
+
+    # Non-zero exit makes the harness usable as a regression gate
+    failed = False
+    if args.min_accuracy is not None and report["accuracy"] < args.min_accuracy:
+        print(f"FAIL: accuracy {report['accuracy']:.1%} < {args.min_accuracy:.1%}")
+        failed = True
+    end_to_end = report["stages_ms"].get("end_to_end")
+    if args.max_p95_ms is not None and end_to_end and end_to_end["p95"] > args.max_p95_ms:
+        print(f"FAIL: end-to-end p95 {end_to_end['p95']:.1f}ms > {args.max_p95_ms}ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import math
+import audioop
+from Utils.startup import lazy_import
+
+sr = lazy_import("speech_recognition")
+
+
+class PartialCommandTracker:
+    """Watches partial hypotheses and reports a command once it is safe to act on.
+
+    A command is reported when the same phrase has matched for
+    `stable_frames` consecutive captured frames and no longer command phrase
+    starts with it (so "open google" waits if "open google docs" exists).
+    `prefix_phrases` is the set of such phrases, as precomputed by
+    CommandTable. Partials containing an exit phrase are never acted on early.
+    """
+
+    def __init__(self, match, prefix_phrases, exit_phrases=(), stable_frames=4):
+        self.match = match  # Callable mapping text to a command phrase or None
+        self.prefix_phrases = frozenset(prefix_phrases)
+        self.exit_phrases = list(exit_phrases)
+        self.stable_frames = stable_frames
+        self.fired = None
+        self._candidate = None
+        self._streak = 0
+
+    def update(self, text):
+        """Feed the current hypothesis; returns the command phrase once, when it is stable"""
+        if self.fired or not text:
+            return None
+
+        phrase = None
+        if not any(exit_phrase in text for exit_phrase in self.exit_phrases):
+            phrase = self.match(text)
+        if phrase is None or phrase in self.prefix_phrases:
+            self._candidate = None
+            self._streak = 0
+            return None
+
+        if phrase == self._candidate:
+            self._streak += 1
+        else:
+            self._candidate = phrase
+            self._streak = 1
+
+        if self._streak >= self.stable_frames:
+            self.fired = phrase
+            return phrase
+        return None
+
+
+def stream_utterance(source, recognizer, stream, timeout=None, phrase_time_limit=None,
+                     on_speech_start=None, on_partial=None):
+    """Capture one phrase from `source` while feeding every frame to `stream`.
+
+    Endpointing follows sr.Recognizer.listen (energy_threshold and
+    pause_threshold). `on_partial` is called with the current hypothesis after
+    each frame once speech has started. Returns the phrase as sr.AudioData.
+    """
+    seconds_per_buffer = float(source.CHUNK) / source.SAMPLE_RATE
+    pause_buffer_count = int(math.ceil(recognizer.pause_threshold / seconds_per_buffer))
+
+    # Wait for the phrase to start
+    elapsed = 0.0
+    while True:
+        elapsed += seconds_per_buffer
+        if timeout and elapsed > timeout:
+            raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+        buffer = source.stream.read(source.CHUNK)
+        if len(buffer) == 0:
+            raise sr.WaitTimeoutError("audio source ended before a phrase started")
+        if audioop.rms(buffer, source.SAMPLE_WIDTH) > recognizer.energy_threshold:
+            break
+
+    if on_speech_start is not None:
+        on_speech_start()
+
+    frames = []
+    hypothesis = ""
+    phrase_elapsed = 0.0
+    pause_count = 0
+    while len(buffer) > 0:
+        frames.append(buffer)
+        phrase_elapsed += seconds_per_buffer
+
+        partial = stream.feed(buffer)
+        if partial is not None:
+            hypothesis = partial
+        if on_partial is not None and hypothesis:
+            on_partial(hypothesis)
+
+        # End of phrase after enough trailing silence or at the time limit
+        if audioop.rms(buffer, source.SAMPLE_WIDTH) > recognizer.energy_threshold:
+            pause_count = 0
+        else:
+            pause_count += 1
+        if pause_count > pause_buffer_count:
+            break
+        if phrase_time_limit and phrase_elapsed > phrase_time_limit:
+            break
+
+        buffer = source.stream.read(source.CHUNK)
+
+    return sr.AudioData(b"".join(frames), source.SAMPLE_RATE, source.SAMPLE_WIDTH)
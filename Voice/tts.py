@@ -0,0 +1,285 @@
+import os
+import wave
+import queue
+import logging
+import tempfile
+import itertools
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future
+from Utils.startup import lazy_import
+
+log = logging.getLogger("voice.tts")
+
+pyttsx3 = lazy_import("pyttsx3")  # Loads the platform driver, deferred to the worker thread
+
+# Lower numbers are spoken first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+PRIORITY_BACKGROUND = 3  # Cache rendering, only runs when nothing is waiting to be spoken
+
+CachedAudio = namedtuple("CachedAudio", ["channels", "sample_width", "frame_rate", "frames"])
+
+_SAY = "say"
+_RENDER = "render"
+
+
+class SpeechWorker(threading.Thread):
+    """Owns the TTS engine on a dedicated thread and speaks from a priority queue.
+
+    Phrases in `precache` are rendered to in-memory audio in the background
+    after startup, and any other phrase is cached once it has been spoken
+    `cache_min_uses` times. Cached phrases are played straight from memory
+    without going through the synthesizer.
+    """
+
+    def __init__(self, rate=180, volume=0.9, precache=(), cache_size=64, cache_min_uses=2,
+                 on_start=None, on_finish=None):
+        super().__init__(name="tts", daemon=True)
+        self.rate = rate
+        self.volume = volume
+        self.cache_size = cache_size
+        self.cache_min_uses = cache_min_uses
+        self.on_start = on_start
+        self.on_finish = on_finish
+
+        self.ready = Future()  # Resolves to True once the engine is usable, False if init failed
+        self.engine = None
+        self._audio = None  # PyAudio instance, None if cached playback is unavailable
+
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._interrupt = threading.Event()
+        self._stop = threading.Event()
+        self._rendering = False
+        self._finish_sent = False
+
+        self._cache_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._uses = {}
+
+        self.precache(precache)
+
+    def speak(self, text, priority=PRIORITY_NORMAL, interrupt=False):
+        """Queue text to be spoken and return immediately.
+
+        With `interrupt=True` the current utterance is cut off and anything
+        queued at the same or lower priority is dropped.
+        """
+        if interrupt:
+            self.interrupt(priority)
+        self._put(priority, _SAY, text)
+
+    def interrupt(self, priority=PRIORITY_BACKGROUND):
+        """Stop the current utterance and drop queued speech at `priority` or lower"""
+        self._interrupt.set()
+        if self._drain(priority):
+            # Dropped utterances will never report finishing on their own
+            self._notify(self.on_finish, "dropped", False)
+        if self.engine is not None:
+            try:
+                self.engine.stop()
+            except Exception as e:
+                log.error("Error stopping TTS engine: %s", e)
+
+    def precache(self, texts):
+        """Queue phrases to be rendered to cached audio in the background"""
+        for text in texts:
+            if not self.is_cached(text):
+                self._put(PRIORITY_BACKGROUND, _RENDER, text)
+
+    def idle(self):
+        """True when no speech is waiting in the queue"""
+        with self._queue.mutex:
+            return not any(item[2] == _SAY for item in self._queue.queue)
+
+    def is_cached(self, text):
+        with self._cache_lock:
+            return text in self._cache
+
+    def stop(self):
+        """Stop the worker thread after interrupting any speech"""
+        self._stop.set()
+        self.interrupt(PRIORITY_HIGH)  # Drop everything queued, whatever its priority
+        self._put(-1, None, None)  # Wake the worker
+
+    def run(self):
+        if not self._init_engine():
+            return
+
+        while not self._stop.is_set():
+            priority, _, kind, text = self._queue.get()
+            if kind is None:
+                continue
+            self._interrupt.clear()
+            self._finish_sent = False
+            try:
+                if kind == _SAY:
+                    self._say(text)
+                elif kind == _RENDER:
+                    self._render(text)
+            except Exception as e:
+                log.exception("TTS worker error: %s", e)
+
+            # Ensure listeners are released even if the engine never fired its callback
+            if kind == _SAY and not self._finish_sent:
+                log.warning("Speech finished callback not fired, reporting manually")
+                self._notify(self.on_finish, text, False)
+
+        if self._audio is not None:
+            self._audio.terminate()
+        log.info("TTS worker terminated")
+
+    def _init_engine(self):
+        try:
+            log.info("Initializing TTS engine")
+            self.engine = pyttsx3.init()
+
+            # Configure the engine
+            self.engine.setProperty('rate', self.rate)
+            self.engine.setProperty('volume', self.volume)
+
+            # Connect speech callbacks
+            self.engine.connect('started-utterance', self._on_engine_start)
+            self.engine.connect('finished-utterance', self._on_engine_finish)
+
+            # Get some property to verify engine is working
+            voices = self.engine.getProperty('voices')
+            voice_info = f"(Found {len(voices)} voices)" if voices else ""
+            log.info("TTS engine initialized successfully %s", voice_info)
+        except Exception as e:
+            log.exception("Failed to initialize TTS engine: %s", e)
+            self.engine = None
+            self.ready.set_result(False)
+            return False
+
+        # Cached playback needs PyAudio; without it everything is synthesized live
+        try:
+            import pyaudio
+            self._audio = pyaudio.PyAudio()
+        except Exception as e:
+            log.warning("Cached TTS playback unavailable, speaking live only: %s", e)
+            self._audio = None
+
+        self.ready.set_result(True)
+        return True
+
+    def _put(self, priority, kind, text):
+        self._queue.put((priority, next(self._seq), kind, text))
+
+    def _drain(self, priority):
+        """Remove queued speech at or below the given urgency, keeping cache renders.
+
+        Returns the number of utterances dropped.
+        """
+        kept = []
+        dropped = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[2] == _SAY and item[0] >= priority:
+                dropped += 1
+                continue
+            kept.append(item)
+        for item in kept:
+            self._queue.put(item)
+        return dropped
+
+    def _say(self, text):
+        with self._cache_lock:
+            cached = self._cache.get(text)
+            if cached is not None:
+                self._cache.move_to_end(text)
+            uses = self._uses.get(text, 0) + 1
+            self._uses[text] = uses
+
+        if cached is not None and self._audio is not None:
+            log.debug("Speaking (cached): '%s'", text)
+            self._play(cached)
+            return
+
+        log.debug("Speaking: '%s'", text)
+        self.engine.say(text)
+        self.engine.runAndWait()
+
+        # Frequently repeated phrases get rendered for next time
+        if cached is None and uses >= self.cache_min_uses:
+            self._put(PRIORITY_BACKGROUND, _RENDER, text)
+
+    def _play(self, cached):
+        self._notify(self.on_start, "cached")
+        completed = True
+        stream = self._audio.open(
+            format=self._audio.get_format_from_width(cached.sample_width),
+            channels=cached.channels,
+            rate=cached.frame_rate,
+            output=True
+        )
+        try:
+            chunk = 1024 * cached.sample_width * cached.channels
+            for offset in range(0, len(cached.frames), chunk):
+                if self._interrupt.is_set():
+                    completed = False
+                    break
+                stream.write(cached.frames[offset:offset + chunk])
+        finally:
+            stream.stop_stream()
+            stream.close()
+            self._finish_sent = True
+            self._notify(self.on_finish, "cached", completed)
+
+    def _render(self, text):
+        """Synthesize text to an in-memory buffer for instant playback later"""
+        if self._audio is None or self.is_cached(text):
+            return
+
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        self._rendering = True
+        try:
+            self.engine.save_to_file(text, path)
+            self.engine.runAndWait()
+            with wave.open(path, "rb") as wav:
+                cached = CachedAudio(
+                    wav.getnchannels(),
+                    wav.getsampwidth(),
+                    wav.getframerate(),
+                    wav.readframes(wav.getnframes())
+                )
+        except (wave.Error, EOFError, OSError) as e:
+            # Some drivers write formats other than WAV, those phrases stay live
+            log.warning("Could not cache TTS audio for '%s': %s", text, e)
+            return
+        finally:
+            self._rendering = False
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        with self._cache_lock:
+            self._cache[text] = cached
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        log.debug("Cached TTS audio for '%s'", text)
+
+    def _on_engine_start(self, name):
+        if not self._rendering:
+            self._notify(self.on_start, name)
+
+    def _on_engine_finish(self, name, completed):
+        if not self._rendering:
+            self._finish_sent = True
+            self._notify(self.on_finish, name, completed)
+
+    @staticmethod
+    def _notify(callback, *args):
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception as e:
+            log.error("TTS callback error: %s", e)
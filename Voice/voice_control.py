@@ -1,19 +1,32 @@
-import speech_recognition as sr
-import pyttsx3
+import time
 import webbrowser
 import platform
 import subprocess
-import shlex
-import traceback
 import logging
 from enum import Enum, auto
-from threading import Thread, Event
-from PyQt5.QtCore import QObject, pyqtSignal
+from collections import deque
+from threading import Thread, Event, Lock
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+from .command_executor import CommandExecutor, CommandCancelled
+from .recognition import RecognitionPool, create_backends
+from .streaming import PartialCommandTracker, stream_utterance
+from .command_table import CommandTable, CommandConfigWatcher, load_command_table
+from .launcher import AppLauncher
+from .tts import SpeechWorker, PRIORITY_HIGH, PRIORITY_NORMAL
+from Utils.tracing import LatencyTracer
+from Utils.startup import lazy_import, profile
+
+log = logging.getLogger("voice")
+
+# Importing speech_recognition pulls in PyAudio; keep it off the UI startup path
+sr = lazy_import("speech_recognition")
 
 try:
     from Utils import config
 except ImportError:
-    logging.error("Failed to import config module. Check the folder name case.")
+    log.error("Failed to import config module. Check the folder name case.")
     class DummyConfig:
         COMMANDS = {}
         RESPONSES = {"greeting": "Yes?", "goodbye": "Goodbye!"}
@@ -21,13 +34,11 @@ except ImportError:
         APP_MAP = {}
         VOICE_TIMEOUT = 5
         VOICE_PHRASE_TIME_LIMIT = 10
+        COMMAND_WORKERS = 4
+        SHELL_COMMAND_TIMEOUT = 15
+        RECOGNITION_BACKENDS = ["google"]
     config = DummyConfig()
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-
 class ListeningState(Enum):
     """States for the voice controller state machine"""
     INACTIVE = auto()        # Not listening at all
@@ -49,10 +60,11 @@ class VoiceController(QObject):
     # New signal for error reporting
     error_occurred = pyqtSignal(str)
 
-    def __init__(self, window=None):
+    def __init__(self, window=None, recognition_backends=None):
         super().__init__()
-        self.recognizer = sr.Recognizer()
+        self.recognizer = None
         self.engine = None
+        self.tts = None
         self.current_os = platform.system().lower()
         self.state = ListeningState.INACTIVE
         
@@ -64,9 +76,65 @@ class VoiceController(QObject):
         # Initialize configuration
         self._init_config()
         
-        # Initialize TTS engine
-        if not self._init_tts_engine():
-            self.error_occurred.emit("Failed to initialize TTS engine")
+        # Apps are spawned directly from resolved paths
+        self.launcher = AppLauncher(self.current_os)
+        self._start_app_prewarm()
+        
+        # Pick up edits to the command file without restarting
+        self.config_watcher = None
+        if self.commands_file:
+            self.config_watcher = CommandConfigWatcher(
+                self.commands_file,
+                config,
+                self.current_os,
+                self._on_command_table_reloaded,
+                interval=self.commands_reload_interval
+            )
+            self.config_watcher.start()
+        
+        # Slow shell commands run on a worker pool so the listener stays responsive.
+        # Results come back through its signals; Direct because the voice process
+        # has no Qt event loop to queue them onto.
+        self.executor = CommandExecutor(max_workers=self.command_workers)
+        self.executor.command_finished.connect(self._on_command_finished, Qt.DirectConnection)
+        self.executor.command_cancelled.connect(self._on_command_cancelled, Qt.DirectConnection)
+        self._command_traces = {}  # command id -> trace id of queued commands
+        self._command_lock = Lock()
+        
+        # Per-utterance stage timestamps, queryable at runtime via self.tracer.stats()
+        self.tracer = LatencyTracer(
+            window=self.trace_window,
+            slos=self.latency_slos,
+            slo_check_every=self.slo_check_every
+        )
+        
+        # Recognizer, backends and microphone come up in the background so the
+        # window is usable immediately; the listener waits on recognition_ready,
+        # and microphone_ready reports the outcome like tts.ready does
+        self.recognition_pool = None
+        self.recognition_ready = Future()
+        self.microphone_ready = Future()
+        self.microphone_ready.add_done_callback(self._on_microphone_ready)
+        Thread(
+            target=self._init_recognition,
+            args=(recognition_backends,),
+            name="recognition-init",
+            daemon=True
+        ).start()
+        
+        # (future, trace id, early-dispatched phrase) of captured utterances,
+        # delivered to the state machine in capture order. The lock only guards
+        # the queue; handlers run on their own thread under _handler_lock so
+        # capture never waits for command handling.
+        self._pending_transcripts = deque()
+        self._transcript_lock = Lock()
+        self._handler_lock = Lock()
+        self._delivery = ThreadPoolExecutor(max_workers=1, thread_name_prefix="transcripts")
+        # (words after the wake word, deadline) awaiting the rest of a command
+        self._wake_remainder = None
+        
+        # Initialize TTS engine (readiness is reported through self.tts.ready)
+        self._init_tts_engine()
         
         # Initialize recognition components in the listener thread
         self.listener_thread = None
@@ -74,72 +142,217 @@ class VoiceController(QObject):
     def _init_config(self):
         """Load configuration from config module"""
         try:
-            self.commands = config.COMMANDS
-            self.responses = config.RESPONSES
-            self.exit_phrases = config.EXIT_PHRASES
-            self.app_map = config.APP_MAP.get(self.current_os, {})
+            self.commands_file = getattr(config, 'COMMANDS_FILE', None)
+            self.commands_reload_interval = getattr(config, 'COMMANDS_RELOAD_INTERVAL', 1.0)
+            self.command_table = self._load_command_table()
             self.voice_timeout = getattr(config, 'VOICE_TIMEOUT', 5)
             self.voice_phrase_limit = getattr(config, 'VOICE_PHRASE_TIME_LIMIT', 10)
-            logging.info("Configuration loaded successfully")
+            self.command_workers = getattr(config, 'COMMAND_WORKERS', 4)
+            self.shell_command_timeout = getattr(config, 'SHELL_COMMAND_TIMEOUT', 15)
+            self.recognition_backend_names = getattr(config, 'RECOGNITION_BACKENDS', ["google"])
+            self.vosk_model_path = getattr(config, 'VOSK_MODEL_PATH', None)
+            self.recognition_workers = getattr(config, 'RECOGNITION_WORKERS', 2)
+            self.recognition_timeout = getattr(config, 'RECOGNITION_TIMEOUT', 5)
+            self.recognition_slow_threshold = getattr(config, 'RECOGNITION_SLOW_THRESHOLD', 3.0)
+            self.recognition_cooldown = getattr(config, 'RECOGNITION_COOLDOWN', 30)
+            self.stream_early_action = getattr(config, 'STREAM_EARLY_ACTION', "dispatch")
+            self.stream_stable_frames = getattr(config, 'STREAM_STABLE_FRAMES', 4)
+            self.wake_word = getattr(config, 'WAKE_WORD', "hey jarvis").lower()
+            self.wake_continuation_grace = getattr(config, 'WAKE_CONTINUATION_GRACE', 3.0)
+            self.tts_rate = getattr(config, 'TTS_RATE', 180)
+            self.tts_volume = getattr(config, 'TTS_VOLUME', 0.9)
+            self.tts_precache = getattr(config, 'TTS_PRECACHE_RESPONSES', True)
+            self.tts_cache_size = getattr(config, 'TTS_CACHE_SIZE', 64)
+            self.tts_cache_min_uses = getattr(config, 'TTS_CACHE_MIN_USES', 2)
+            self.trace_window = getattr(config, 'TRACE_WINDOW', 500)
+            self.latency_slos = getattr(config, 'LATENCY_SLOS', {})
+            self.slo_check_every = getattr(config, 'TRACE_SLO_CHECK_EVERY', 50)
+            self.trace_dump_path = getattr(config, 'TRACE_DUMP_PATH', None)
+            self.startup_profile_path = getattr(config, 'STARTUP_PROFILE_PATH', None)
+            log.info("Configuration loaded successfully")
         except AttributeError as e:
-            logging.error(f"Failed to load configuration: {e}")
+            log.error("Failed to load configuration: %s", e)
             # Set defaults to prevent crashes
-            self.commands = {}
-            self.responses = {"greeting": "Yes?", "goodbye": "Goodbye!"}
-            self.exit_phrases = ["exit", "quit", "goodbye"]
-            self.app_map = {}
+            self.commands_file = None
+            self.commands_reload_interval = 1.0
+            self.command_table = CommandTable(
+                commands={},
+                responses={"greeting": "Yes?", "goodbye": "Goodbye!"},
+                exit_phrases=["exit", "quit", "goodbye"],
+                app_map={},
+                current_os=self.current_os
+            )
             self.voice_timeout = 5
             self.voice_phrase_limit = 10
+            self.command_workers = 4
+            self.shell_command_timeout = 15
+            self.recognition_backend_names = ["google"]
+            self.vosk_model_path = None
+            self.recognition_workers = 2
+            self.recognition_timeout = 5
+            self.recognition_slow_threshold = 3.0
+            self.recognition_cooldown = 30
+            self.stream_early_action = "dispatch"
+            self.stream_stable_frames = 4
+            self.wake_word = "hey jarvis"
+            self.wake_continuation_grace = 3.0
+            self.tts_rate = 180
+            self.tts_volume = 0.9
+            self.tts_precache = True
+            self.tts_cache_size = 64
+            self.tts_cache_min_uses = 2
+            self.trace_window = 500
+            self.latency_slos = {}
+            self.slo_check_every = 50
+            self.trace_dump_path = None
+            self.startup_profile_path = None
             
+    def _start_app_prewarm(self):
+        """Resolve the configured apps in the background so the first launch doesn't search PATH"""
+        Thread(
+            target=self.launcher.prewarm,
+            args=(list(self.command_table.app_names.values()),),
+            name="app-prewarm",
+            daemon=True
+        ).start()
+    
+    def _load_command_table(self):
+        """Compile commands from the command file, falling back to the config module"""
+        try:
+            table = load_command_table(config, self.current_os, self.commands_file)
+        except Exception as e:
+            log.error("Failed to load commands from %s, using config defaults: %s", self.commands_file, e)
+            table = load_command_table(config, self.current_os)
+        log.info("Loaded %s commands from %s", len(table.commands), table.source or 'config')
+        return table
+    
+    def _on_command_table_reloaded(self, table):
+        """Swap in a newly compiled command table (called on the watcher thread)"""
+        # Single reference assignment: handlers already holding the old table finish with it
+        self.command_table = table
+        self.launcher.prewarm(table.app_names.values())
+        if self.tts and self.tts_precache:
+            self.tts.precache(table.responses.values())
+    
+    # Read-only views of the current command table
+    @property
+    def commands(self):
+        return self.command_table.commands
+    
+    @property
+    def responses(self):
+        return self.command_table.responses
+    
+    @property
+    def exit_phrases(self):
+        return self.command_table.exit_phrases
+    
+    @property
+    def app_map(self):
+        return self.command_table.app_map
+    
+    def _init_recognition(self, backends=None):
+        """Create the recognizer and recognition pool (runs on a background thread)"""
+        try:
+            # Recognition runs on its own pool so capture continues while utterances are transcribed
+            self.recognizer = sr.Recognizer()
+            if backends is None:
+                backends = create_backends(
+                    self.recognition_backend_names,
+                    vosk_model_path=self.vosk_model_path,
+                    timeout=self.recognition_timeout
+                )
+            self.recognition_pool = RecognitionPool(
+                backends,
+                max_workers=self.recognition_workers,
+                slow_threshold=self.recognition_slow_threshold,
+                cooldown=self.recognition_cooldown
+            )
+        except Exception as e:
+            log.exception("Failed to initialize speech recognition: %s", e)
+            self.recognition_ready.set_exception(e)
+            self.error_occurred.emit(f"Speech recognition unavailable: {e}")
+            return
+        profile.mark("recognizer ready")
+        self.recognition_ready.set_result(True)
+    
     def _init_tts_engine(self):
-        """Initialize TTS engine with proper error handling"""
+        """Start the TTS worker thread; its engine comes up in the background"""
+        # Fixed responses are pre-rendered in the background so they play instantly
+        precache = list(self.responses.values()) if self.tts_precache else []
+        self.tts = SpeechWorker(
+            rate=self.tts_rate,
+            volume=self.tts_volume,
+            precache=precache,
+            cache_size=self.tts_cache_size,
+            cache_min_uses=self.tts_cache_min_uses,
+            on_start=self._on_speak_start,
+            on_finish=self._on_speak_finish
+        )
+        self.tts.ready.add_done_callback(self._on_tts_ready)
+        self.tts.start()
+    
+    def _on_tts_ready(self, future):
+        """Record the TTS engine once the worker has initialized it (called on the worker thread)"""
         try:
-            logging.info("Initializing TTS engine")
-            self.engine = pyttsx3.init()
-            
-            # Configure the engine
-            self.engine.setProperty('rate', 180)
-            self.engine.setProperty('volume', 0.9)
-            
-            # Connect speech callbacks
-            self.engine.connect('started-utterance', self._on_speak_start)
-            self.engine.connect('finished-utterance', self._on_speak_finish)
-            
-            # Get some property to verify engine is working
-            voices = self.engine.getProperty('voices')
-            voice_info = f"(Found {len(voices)} voices)" if voices else ""
-            logging.info(f"TTS engine initialized successfully {voice_info}")
-            
-            return True
+            ready = future.result()
+        except Exception as e:
+            log.error("TTS engine did not become ready: %s", e)
+            ready = False
+        
+        if ready:
+            self.engine = self.tts.engine
+            profile.mark("tts ready")
+        else:
+            # Text queued before the failure will never be spoken; don't leave
+            # the listener waiting for it to finish
+            self.speech_finished_event.set()
+            self.error_occurred.emit("Failed to initialize TTS engine")
+    
+    def _on_microphone_ready(self, future):
+        """Report the microphone opening, or failing to (called on the listener thread)"""
+        try:
+            device_index = future.result()
         except Exception as e:
-            logging.error(f"Failed to initialize TTS engine: {e}")
-            logging.error(traceback.format_exc())
-            self.engine = None
+            log.error("Microphone error: %s", e)
+            self.error_occurred.emit(f"Microphone error: {e}")
+            return
+        log.info("Microphone '%s' opened", device_index)
+        profile.mark("microphone open")
+    
+    def _tts_failed(self):
+        """True once TTS initialization has finished without an engine"""
+        if not self.tts:
+            return True
+        if not self.tts.ready.done():
             return False
+        return self.tts.ready.exception() is not None or not self.tts.ready.result()
     
     def _on_speak_start(self, name):
         """Callback when TTS starts speaking"""
-        logging.debug(f"TTS started speaking (name={name})")
+        log.debug("TTS started speaking (name=%s)", name)
         self.speech_finished_event.clear()  # Mark that speaking has started
         self.started_speaking.emit()
         
     def _on_speak_finish(self, name, completed):
         """Callback when TTS finishes speaking"""
-        logging.debug(f"TTS finished speaking (name={name}, completed={completed})")
-        self.speech_finished_event.set()  # Mark that speaking has finished
+        log.debug("TTS finished speaking (name=%s, completed=%s)", name, completed)
+        # Only release the listener once nothing else is queued to be spoken
+        if self.tts.idle():
+            self.speech_finished_event.set()  # Mark that speaking has finished
         self.finished_speaking.emit()
     
     def start_listening(self):
         """Start the listening process"""
         if self.state != ListeningState.INACTIVE:
-            logging.info("Already listening, ignoring start request")
+            log.info("Already listening, ignoring start request")
             return
             
-        if not self.engine:
+        if self._tts_failed():
             self.error_occurred.emit("Cannot start listening - TTS Engine not initialized")
             return
             
-        logging.info("Starting listener thread")
+        log.info("Starting listener thread")
         self.stop_event.clear()  # Clear the stop event flag
         
         # Create a new thread if needed (can't restart a stopped thread)
@@ -154,103 +367,112 @@ class VoiceController(QObject):
         if self.state == ListeningState.INACTIVE:
             return
             
-        logging.info("Stopping listener thread")
+        log.info("Stopping listener thread")
         self.stop_event.set()  # Signal the thread to stop
         self.state = ListeningState.INACTIVE
     
-    def speak(self, text):
-        if not self.engine:
-            logging.error("TTS Engine not available. Cannot speak.")
+    def shutdown(self):
+        """Stop listening, cancel running commands and stop the TTS worker"""
+        self.stop_listening()
+        self._delivery.shutdown(wait=False)
+        self.executor.shutdown()
+        if self.recognition_pool:
+            self.recognition_pool.shutdown()
+        if self.config_watcher:
+            self.config_watcher.stop()
+        if self.tts:
+            self.tts.stop()
+        self.tracer.report_slos()
+        if self.trace_dump_path:
+            count = self.tracer.dump_jsonl(self.trace_dump_path)
+            log.info("Wrote %s latency traces to %s", count, self.trace_dump_path)
+    
+    def speak(self, text, priority=PRIORITY_NORMAL, interrupt=False):
+        """Queue text on the TTS worker and return without waiting for it to be spoken"""
+        # Text queued before the engine is up is spoken once it is
+        if self._tts_failed():
+            log.error("TTS Engine not available. Cannot speak.")
             self.speech_finished_event.set()
             return
-            
-        previous_state = self.state
-        self.state = ListeningState.SPEAKING
         
-        try:
-            logging.debug(f"Speaking: '{text}'")
-            self.speech_finished_event.clear()
-            self.engine.say(text)
-            
-            # Use a timeout to prevent blocking forever
-            self.engine.runAndWait()
-            
-            # Ensure we don't get stuck if the callback fails
-            if not self.speech_finished_event.is_set():
-                logging.warning("Speech finished event not set by callback, setting manually")
-                self.speech_finished_event.set()
-                self.finished_speaking.emit()  # Make sure to emit the signal too
-        except Exception as e:
-            logging.error(f"Error during speak: {e}")
-            logging.error(traceback.format_exc())
+        # Cleared here rather than in the start callback so the listener stops
+        # capturing before our own voice reaches the microphone
+        self.speech_finished_event.clear()
+        self.tts.speak(text, priority=priority, interrupt=interrupt)
+        if self._tts_failed():
+            # Initialization failed between the check above and the clear
             self.speech_finished_event.set()
-            self.finished_speaking.emit()  # Ensure signal is emitted
-            
-            try:
-                self.engine.stop()
-            except Exception as stop_e:
-                logging.error(f"Error stopping engine: {stop_e}")
-        
-        # Ensure state is restored even if exceptions occurred
-        self.state = previous_state
+    
+    def stop_speaking(self):
+        """Interrupt the current utterance and drop anything queued"""
+        if self.tts:
+            self.tts.interrupt(PRIORITY_HIGH)  # Every priority, not just background
     
     def _listen_loop(self):
         """Main listening loop that runs in a separate thread"""
-        mic_retry_delay = 3
         noise_adjust_duration = 1.0
         
+        try:
+            # Nothing to listen with until the recognizer is up
+            self.recognition_ready.result()
+        except Exception:
+            log.info("Listener thread terminated")
+            return
+        
         try:
             # Initialize microphone once outside the loop
             with sr.Microphone() as source:
-                logging.info(f"Microphone '{source.device_index}' opened")
+                if not self.microphone_ready.done():
+                    self.microphone_ready.set_result(source.device_index)
+                
+                # Startup is complete once the loop starts capturing
+                profile.mark("listening for wake word")
+                profile.report(self.startup_profile_path)
                 
                 # Main listening loop
                 while not self.stop_event.is_set():
                     try:
-                        # Adjust for ambient noise periodically
-                        self.recognizer.adjust_for_ambient_noise(source, duration=noise_adjust_duration)
+                        # Don't capture our own voice while the TTS worker is speaking
+                        # This avoids consuming CPU while waiting for speech to finish
+                        if not self.speech_finished_event.is_set():
+                            self.speech_finished_event.wait(timeout=0.1)
+                            continue
+                        
+                        # Adjust for ambient noise periodically, but not while the rest of
+                        # a command begun with the wake word may already be being spoken
+                        if self._wake_remainder is None:
+                            self.recognizer.adjust_for_ambient_noise(source, duration=noise_adjust_duration)
                         
                         # Handle different states
                         if self.state == ListeningState.WAIT_WAKE_WORD:
                             self._listen_for_wake_word(source)
                         elif self.state == ListeningState.WAIT_COMMAND:
                             self._listen_for_command(source)
-                        elif self.state == ListeningState.SPEAKING:
-                            # If we're speaking, wait a bit before checking again
-                            # This avoids consuming CPU while waiting for speech to finish
-                            self.speech_finished_event.wait(timeout=0.1)
                             
                     except sr.WaitTimeoutError:
                         # Timeouts are normal during listening, no need to log
                         continue
-                    except sr.UnknownValueError:
-                        # Unrecognized speech is normal, no need to log
-                        continue
-                    except sr.RequestError as e:
-                        logging.error(f"Speech recognition service error: {e}")
-                        if self.state == ListeningState.WAIT_COMMAND:
-                            self.speak(self.responses.get("speech_service_error", "Sorry, speech service failed."))
-                            self.state = ListeningState.WAIT_WAKE_WORD
                     except Exception as e:
-                        logging.error(f"Error in listening loop: {e}")
-                        logging.error(traceback.format_exc())
+                        log.exception("Error in listening loop: %s", e)
                         # Wait a bit before retrying to avoid rapid error loops
                         if self.stop_event.wait(timeout=1):
                             break  # Stop was requested during wait
                     
         except (OSError, AttributeError) as e:
-            logging.error(f"Microphone error: {e}")
-            self.error_occurred.emit(f"Microphone error: {e}")
+            if not self.microphone_ready.done():
+                self.microphone_ready.set_exception(e)
+            else:
+                log.error("Microphone error: %s", e)
+                self.error_occurred.emit(f"Microphone error: {e}")
         except Exception as e:
-            logging.error(f"Fatal error in listener thread: {e}")
-            logging.error(traceback.format_exc())
+            log.exception("Fatal error in listener thread: %s", e)
             self.error_occurred.emit(f"Fatal error: {e}")
         
-        logging.info("Listener thread terminated")
+        log.info("Listener thread terminated")
     
     def _listen_for_wake_word(self, source):
-        """Listen specifically for the wake word"""
-        logging.debug("Listening for wake word...")
+        """Capture an utterance that may contain the wake word"""
+        log.debug("Listening for wake word...")
         
         # Listen for audio
         audio = self.recognizer.listen(
@@ -259,27 +481,19 @@ class VoiceController(QObject):
             phrase_time_limit=self.voice_phrase_limit
         )
         
-        # Recognize the speech
-        text = self.recognizer.recognize_google(audio).lower()
-        logging.debug(f"Heard: '{text}'")
-        
-        # Check for wake word
-        if "hey jarvis" in text:  # Could be made configurable
-            logging.info("Wake word detected!")
-            self.show_window.emit()
-            
-            # # Speak greeting
-            # self.speak(self.responses.get("greeting", "Yes?"))
-            
-            # # Wait for speech to finish 
-            # self.speech_finished_event.wait()
-            
-            # Transition to command listening state
-            self.state = ListeningState.WAIT_COMMAND
+        # Recognition happens on the pool, capture continues immediately
+        self._submit_audio(audio)
     
     def _listen_for_command(self, source):
-        """Listen for and process commands after wake word is detected"""
-        logging.debug("Listening for command...")
+        """Capture a command utterance after the wake word is detected"""
+        log.debug("Listening for command...")
+        
+        # Prefer incremental recognition so commands can be acted on before the phrase ends
+        if self.stream_early_action != "off":
+            stream = self.recognition_pool.open_stream(source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+            if stream is not None:
+                self._stream_command(source, stream)
+                return
         
         # Listen with slightly longer timeouts for commands
         audio = self.recognizer.listen(
@@ -288,23 +502,259 @@ class VoiceController(QObject):
             phrase_time_limit=self.voice_phrase_limit + 4
         )
         
-        # Recognize the speech
-        text = self.recognizer.recognize_google(audio).lower()
-        logging.info(f"Command recognized: '{text}'")
+        self._submit_audio(audio)
+    
+    def _stream_command(self, source, stream):
+        """Capture a command while recognizing it incrementally.
+        
+        Once a partial hypothesis holds a stable, unambiguous command it is
+        dispatched (or prepared) straight away instead of waiting for the
+        trailing silence that ends the phrase.
+        """
+        table = self.command_table
+        tracker = PartialCommandTracker(
+            table.match,
+            table.prefix_phrases,
+            exit_phrases=table.exit_phrases,
+            stable_frames=self.stream_stable_frames
+        )
+        trace_id = None
+        dispatched = None
+        
+        def on_speech_start():
+            nonlocal trace_id
+            trace_id = self.tracer.begin(stage="speech_start", streaming=True)
+        
+        def on_partial(text):
+            nonlocal dispatched
+            phrase = tracker.update(text)
+            if phrase is not None:
+                dispatched = self._act_on_partial(phrase, text, trace_id)
+        
+        try:
+            audio = stream_utterance(
+                source,
+                self.recognizer,
+                stream,
+                timeout=self.voice_timeout + 3,
+                phrase_time_limit=self.voice_phrase_limit + 4,
+                on_speech_start=on_speech_start,
+                on_partial=on_partial
+            )
+        except sr.WaitTimeoutError:
+            raise  # No phrase started, handled by the listen loop
+        except Exception as e:
+            log.error("Streaming capture failed: %s", e)
+            # An early-dispatched command closes its own trace
+            if not dispatched:
+                self.tracer.finish(trace_id, outcome="stream_error")
+            return
+        self.tracer.mark(trace_id, "capture_end")
+        
+        future = Future()
+        try:
+            future.set_result(stream.finish())
+        except sr.UnknownValueError as e:
+            future.set_exception(e)
+        except Exception as e:
+            # Streaming engine failed at the last step, recognize the whole phrase instead
+            log.warning("Streaming recognition failed, falling back to full recognition: %s", e)
+            self._submit_audio(audio, trace_id=trace_id, dispatched=dispatched)
+            return
+        
+        self.tracer.mark(trace_id, "recognition_end")
+        self._enqueue_transcript(future, trace_id, dispatched)
+    
+    def _act_on_partial(self, phrase, text, trace_id):
+        """Dispatch or prepare a command recognized from a partial hypothesis.
+        
+        Returns the phrase if it was dispatched, otherwise None.
+        """
+        # Runs on the capture thread: never wait for a handler, just skip the early dispatch
+        if self.stream_early_action == "dispatch" and self._handler_lock.acquire(blocking=False):
+            try:
+                with self._transcript_lock:
+                    # Earlier utterances still being recognized must be handled first
+                    idle = not self._pending_transcripts
+                if idle and self.state == ListeningState.WAIT_COMMAND:
+                    log.info("Early dispatch of '%s' from partial '%s'", phrase, text)
+                    self.tracer.mark(trace_id, "early_dispatch")
+                    self._process_command(text, trace_id)
+                    return phrase
+            finally:
+                self._handler_lock.release()
+        
+        self._prepare_command(phrase)
+        return None
+    
+    def _prepare_command(self, command_phrase):
+        """Resolve what a command will need so executing it later is cheaper"""
+        spec = self.commands.get(command_phrase)
+        if spec is not None and spec.type == "app":
+            self.launcher.resolve(spec.resolved)
+            log.debug("Prepared app command for '%s'", command_phrase)
+    
+    def _submit_audio(self, audio, trace_id=None, dispatched=None):
+        """Queue captured audio for recognition and return its trace id"""
+        if trace_id is None:
+            # The phrase's length lets later stages work out when speech started
+            trace_id = self.tracer.begin(audio_s=len(audio.frame_data) / (audio.sample_rate * audio.sample_width))
+        future = self.recognition_pool.submit(
+            audio,
+            on_start=partial(self.tracer.mark, trace_id, "recognition_start")
+        )
+        future.add_done_callback(lambda f: self.tracer.mark(trace_id, "recognition_end"))
+        self._enqueue_transcript(future, trace_id, dispatched)
+        return trace_id
+    
+    def _enqueue_transcript(self, future, trace_id, dispatched=None):
+        """Add a pending transcript to the in-order delivery queue"""
+        with self._transcript_lock:
+            self._pending_transcripts.append((future, trace_id, dispatched))
+        # Handled on the delivery thread, even when the future is already done
+        # and this callback would otherwise run right here on the capture thread
+        future.add_done_callback(self._schedule_delivery)
+    
+    def _schedule_delivery(self, _future=None):
+        try:
+            self._delivery.submit(self._deliver_transcripts)
+        except RuntimeError:
+            pass  # Shut down; nothing left to deliver to
+    
+    def _deliver_transcripts(self):
+        """Hand finished transcripts to the state machine in capture order"""
+        # The lock serializes handlers, so state transitions never interleave
+        with self._handler_lock:
+            while True:
+                with self._transcript_lock:
+                    if not (self._pending_transcripts and self._pending_transcripts[0][0].done()):
+                        return
+                    future, trace_id, dispatched = self._pending_transcripts.popleft()
+                try:
+                    self._handle_transcript(future, trace_id, dispatched)
+                except Exception as e:
+                    log.exception("Error handling transcript: %s", e)
+    
+    def _handle_transcript(self, future, trace_id=None, dispatched=None):
+        """Apply one recognition result to the current listening state"""
+        if future.cancelled():
+            self.tracer.finish(trace_id, outcome="cancelled")
+            return
+        try:
+            text = future.result()
+        except sr.UnknownValueError:
+            # Unrecognized speech is normal, no need to log
+            if not dispatched:
+                self.tracer.finish(trace_id, outcome="unrecognized")
+            return
+        except sr.RequestError as e:
+            log.error("Speech recognition service error: %s", e)
+            self.tracer.finish(trace_id, outcome="recognition_error")
+            if self.state == ListeningState.WAIT_COMMAND:
+                self.speak(self.responses.get("speech_service_error", "Sorry, speech service failed."))
+                self.state = ListeningState.WAIT_WAKE_WORD
+            return
+        
+        if self.state == ListeningState.WAIT_WAKE_WORD:
+            log.debug("Heard: '%s'", text)
+            self._handle_wake_word(text, trace_id)
+        elif self.state == ListeningState.WAIT_COMMAND:
+            text = self._join_continuation(text, trace_id)
+            log.info("Command recognized: '%s'", text)
+            if dispatched:
+                # Already acted on from a partial and its trace is owned by that
+                # command; running the final match too would fire two actions
+                final = self._match_command(text)
+                if final != dispatched:
+                    log.warning("Final transcript '%s' matches '%s', not the early-dispatched '%s'; not executing it",
+                                text, final, dispatched)
+                return
+            self._process_command(text, trace_id)
+        else:
+            self.tracer.finish(trace_id, outcome="ignored")
+    
+    def _handle_wake_word(self, text, trace_id=None):
+        """Check a transcript for the wake word and any command spoken with it"""
+        position = text.lower().find(self.wake_word)
+        if position < 0:
+            self.tracer.finish(trace_id, outcome="no_wake_word")
+            return
+        
+        log.info("Wake word detected!")
+        # Words after the wake word, e.g. "open chrome" in "hey jarvis open chrome"
+        remainder = text[position + len(self.wake_word):].strip(" ,.!?")
+        self._wake_remainder = None
+        # When the remainder was spoken; the trace may close once show_window lands
+        spoken_at = self.tracer.timestamp(trace_id, "capture_end") or time.perf_counter()
         
-        # Process the command
-        self._process_command(text)
+        table = self.command_table
+        if remainder and (table.match(remainder) is not None or table.is_exit(remainder)):
+            # The whole command came with the wake word, no second utterance needed
+            self.state = ListeningState.WAIT_COMMAND
+            self.tracer.mark(trace_id, "wake_word")
+            self.tracer.expect_delivery(None, "show_window")  # The trace ends with the command's signal
+            self.show_window.emit()
+            self._process_command(remainder, trace_id)
+            return
+        
+        self.tracer.mark(trace_id, "match", outcome="wake_word")
+        self.tracer.expect_delivery(trace_id, "show_window")
+        self.show_window.emit()
+        
+        # # Speak greeting
+        # self.speak(self.responses.get("greeting", "Yes?"))
+        
+        # # Wait for speech to finish 
+        # self.speech_finished_event.wait()
+        
+        # Transition to command listening state
+        self.state = ListeningState.WAIT_COMMAND
+        if remainder:
+            # Likely the start of a command ("hey jarvis open ... chrome"); joined to the next utterance
+            self._wake_remainder = (remainder, spoken_at + self.wake_continuation_grace)
+    
+    def _join_continuation(self, text, trace_id=None):
+        """Prefix a command with words left over from the wake-word utterance while they're fresh"""
+        pending, self._wake_remainder = self._wake_remainder, None
+        if pending is None:
+            return text
+        remainder, deadline = pending
+        # Judged by when the continuation started, not by how long it or its recognition took
+        if self._speech_started_at(trace_id) > deadline:
+            return text
+        
+        # Keep the join only if it makes a command the continuation alone doesn't
+        joined = f"{remainder} {text}"
+        if self._match_command(text) is None and self._match_command(joined) is not None:
+            log.info("Joined '%s' to words after the wake word: '%s'", text, joined)
+            return joined
+        return text
+    
+    def _speech_started_at(self, trace_id):
+        """perf_counter time at which the utterance of `trace_id` started"""
+        started = self.tracer.timestamp(trace_id, "speech_start")
+        if started is not None:
+            return started  # Streamed: marked when the phrase started
+        captured = self.tracer.timestamp(trace_id, "capture_end")
+        if captured is None:
+            return time.perf_counter()
+        return captured - self.tracer.get(trace_id, "audio_s", 0.0)
     
-    def _process_command(self, text):
+    def _process_command(self, text, trace_id=None):
         """Process the recognized command text"""
-        logging.info(f"Processing command: '{text}'")
+        log.info("Processing command: '%s'", text)
         self.command_received.emit(text)
         
+        # One table for the whole command, even if a reload lands meanwhile
+        table = self.command_table
+        
         # Check for exit phrases
-        if any(phrase in text for phrase in self.exit_phrases):
-            logging.info("Exit phrase detected")
+        if table.is_exit(text):
+            log.info("Exit phrase detected")
             # self.speak(self.responses.get("goodbye", "Goodbye!"))
             # self.speech_finished_event.wait()  # Wait for goodbye to finish
+            self.tracer.mark(trace_id, "match", outcome="exit")
+            self.tracer.expect_delivery(trace_id, "close_window")
             self.close_window.emit()
             self.stop_listening()
             return
@@ -313,91 +763,120 @@ class VoiceController(QObject):
         command_executed = False
         matched_command = None
         
-        # Sort commands by length for better matching
-        sorted_command_phrases = sorted(self.commands.keys(), key=len, reverse=True)
-        
-        for command_phrase in sorted_command_phrases:
-            if command_phrase in text:
-                details = self.commands[command_phrase]
-                matched_command = command_phrase
-                logging.info(f"Matched command phrase: '{command_phrase}'")
-                
-                command_type = details.get("type")
-                action = details.get("action")
-                
-                try:
-                    # Execute command based on type
-                    if command_type == "url":
-                        command_executed = self._execute_url_command(action)
-                    elif command_type == "app":
-                        command_executed = self._execute_app_command(action)
-                    elif command_type in ["shell", "shell_speak"]:
-                        command_executed = self._execute_shell_command(command_type, action)
-                    elif command_type == "speak":
-                        command_executed = self._execute_speak_command(action)
-                    else:
-                        logging.warning(f"Unknown command type '{command_type}' for phrase '{command_phrase}'")
-                except Exception as e:
-                    logging.error(f"Error executing command '{command_phrase}': {e}")
-                    logging.error(traceback.format_exc())
-                    # self.speak(self.responses.get("error_execute", "Sorry, an error occurred while doing that."))
-                
-                # Stop looking for more commands once we find a match
-                break
+        command_phrase = table.match(text)
+        if command_phrase is not None:
+            spec = table.commands[command_phrase]
+            matched_command = command_phrase
+            log.info("Matched command phrase: '%s'", command_phrase)
+            self.tracer.mark(trace_id, "match", command=command_phrase)
+            
+            command_type = spec.type
+            # Shell actions come pre-resolved for this OS, apps resolve through the table
+            action = spec.action if command_type == "app" else spec.resolved
+            
+            try:
+                # Execute command based on type. Shell commands may take seconds,
+                # so they go to the executor and report back through
+                # _on_command_done while the listener takes the next command.
+                # Apps are spawned detached, which returns immediately.
+                if command_type == "url":
+                    command_executed = self._run_traced(trace_id, self._execute_url_command, action)
+                elif command_type == "app":
+                    command_executed = self._run_traced(trace_id, self._execute_app_command, action)
+                elif command_type in ["shell", "shell_speak"]:
+                    self._submit_command(trace_id, command_phrase, self.shell_command_timeout,
+                                         self._execute_shell_command, command_type, action)
+                    return
+                elif command_type == "speak":
+                    command_executed = self._run_traced(trace_id, self._execute_speak_command, action)
+                else:
+                    log.warning("Unknown command type '%s' for phrase '%s'", command_type, command_phrase)
+            except Exception as e:
+                log.exception("Error executing command '%s': %s", command_phrase, e)
+                # self.speak(self.responses.get("error_execute", "Sorry, an error occurred while doing that."))
         
-        # Handle post-execution actions
+        if matched_command:
+            self._handle_command_result(matched_command, command_executed, trace_id)
+        else:
+            log.info("No matching command found for: '%s'", text)
+            self.tracer.finish(trace_id, outcome="no_match")
+            # self.speak(self.responses.get("unknown_command", "Sorry, I don't know how to do that."))
+            # self.speak(self.responses.get("anything_else", "Is there anything else?"))
+            # Stay in command listening state
+    
+    def _match_command(self, text):
+        """Return the command phrase contained in text, preferring the longest, or None"""
+        return self.command_table.match(text)
+    
+    def _run_traced(self, trace_id, fn, *args):
+        """Run a command function, recording execution start and end for its trace"""
+        self.tracer.mark(trace_id, "execution_start")
+        try:
+            return fn(*args)
+        finally:
+            self.tracer.mark(trace_id, "execution_end")
+    
+    def _submit_command(self, trace_id, command_phrase, timeout, fn, *args):
+        """Queue a slow command on the executor; its result arrives through _on_command_finished"""
+        # Held across submit so a command that finishes at once still finds its trace
+        with self._command_lock:
+            future = self.executor.submit(command_phrase, self._run_traced, trace_id, fn, *args, timeout=timeout)
+            self._command_traces[future.command_id] = trace_id
+        return future
+    
+    def _on_command_finished(self, command_id, command_phrase, success):
+        """CommandExecutor.command_finished, on an executor thread"""
+        with self._command_lock:
+            if command_id not in self._command_traces:
+                return  # Cancelled, and already reported
+            trace_id = self._command_traces.pop(command_id)
+        log.debug("Command #%s '%s' finished (success=%s)", command_id, command_phrase, success)
+        self._handle_command_result(command_phrase, success, trace_id)
+    
+    def _on_command_cancelled(self, command_id, command_phrase):
+        """CommandExecutor.command_cancelled: timed out, or stopped by shutdown"""
+        with self._command_lock:
+            trace_id = self._command_traces.pop(command_id, None)
+        self.tracer.finish(trace_id, outcome="cancelled")
+        if not self.stop_event.is_set():
+            self.error_occurred.emit(f"Command '{command_phrase}' was cancelled")
+    
+    def _handle_command_result(self, command_phrase, command_executed, trace_id=None):
+        """Handle post-execution actions for a matched command"""
         if command_executed:
-            logging.info("Command executed successfully")
+            log.info("Command '%s' executed successfully", command_phrase)
+            self.tracer.expect_delivery(trace_id, "minimize_window")
             self.minimize_window.emit()
             # self.speak(self.responses.get("anything_else", "Is there anything else?"))
             # Stay in command listening state
-        elif matched_command:
-            logging.info("Command matched but failed execution")
-            # self.speak(self.responses.get("anything_else", "Is there anything else I can try?"))
-            # Stay in command listening state
         else:
-            logging.info(f"No matching command found for: '{text}'")
-            # self.speak(self.responses.get("unknown_command", "Sorry, I don't know how to do that."))
-            # self.speak(self.responses.get("anything_else", "Is there anything else?"))
+            log.info("Command '%s' matched but failed execution", command_phrase)
+            self.tracer.finish(trace_id, outcome="failed")
+            # self.speak(self.responses.get("anything_else", "Is there anything else I can try?"))
             # Stay in command listening state
     
     def _execute_url_command(self, url):
         """Execute a URL command"""
-        logging.info(f"Opening URL: {url}")
+        log.info("Opening URL: %s", url)
         # self.speak(self.responses.get("opening_url", "Opening website."))
         webbrowser.open(url)
         return True
     
     def _execute_app_command(self, app_name):
         """Execute an application command"""
-        app_command_str = self._get_open_command(app_name)
-        if not app_command_str:
-            logging.error(f"Could not generate command for app '{app_name}'")
-            # self.speak(self.responses.get("error_execute", "Error preparing app command."))
-            return False
-            
-        logging.info(f"Running app command: `{app_command_str}`")
+        mapped_name = self.command_table.resolve_app(app_name)
+        log.info("Opening app. Key='%s', Mapped Name='%s', OS='%s'", app_name, mapped_name, self.current_os)
         # self.speak(self.responses.get("opening_app", "Opening application."))
         
         try:
-            result = subprocess.run(
-                app_command_str, 
-                shell=True, 
-                capture_output=True, 
-                text=True, 
-                check=False,  # Don't raise exception on non-zero exit
-                timeout=10
-            )
-            
-            if result.returncode != 0:
-                logging.warning(f"App command returned non-zero exit code {result.returncode}: {result.stderr}")
-            
-            return True  # Consider it executed even if there was an error
-        except subprocess.TimeoutExpired:
-            logging.error(f"App command timed out: {app_command_str}")
+            # Spawned detached without a shell; returns as soon as the process exists
+            return self.launcher.launch(mapped_name)
+        except FileNotFoundError as e:
+            log.error("Could not open app '%s': %s", app_name, e)
+            # self.speak(self.responses.get("error_execute", "Error preparing app command."))
             return False
         except Exception as e:
-            logging.error(f"Error running app command: {e}")
+            log.error("Error opening app '%s': %s", mapped_name, e)
             return False
     
     def _execute_shell_command(self, command_type, action):
@@ -406,71 +885,47 @@ class VoiceController(QObject):
         shell_action_str = action.get(self.current_os) if isinstance(action, dict) else action
         
         if not shell_action_str:
-            logging.warning(f"Shell command not supported on OS '{self.current_os}'")
+            log.warning("Shell command not supported on OS '%s'", self.current_os)
             # self.speak(self.responses.get("os_not_supported", "Sorry, that command isn't available on your system."))
             return False
             
-        logging.info(f"Running shell command: `{shell_action_str}`")
+        log.info("Running shell command: `%s`", shell_action_str)
         # self.speak(self.responses.get("running_command", "Running command."))
         
         try:
-            result = subprocess.run(
+            # The executor's command timeout kills the process if it runs too long
+            result = self.executor.run_process(
                 shell_action_str, 
                 shell=True, 
-                capture_output=True, 
-                text=True, 
-                check=True,  # Raise exception on non-zero exit
-                timeout=15
+                check=True  # Raise exception on non-zero exit
             )
             
             # Handle shell_speak type to speak the output
             if command_type == "shell_speak" and result.stdout:
                 response_text = result.stdout.strip()
-                logging.info(f"Shell speak response: '{response_text}'")
+                log.info("Shell speak response: '%s'", response_text)
                 # self.speak(f"{self.responses.get('speaking_response', 'Okay:')} {response_text}")
                 
             return True
         except subprocess.CalledProcessError as e:
             error_output = e.stderr.strip() if e.stderr else e.stdout.strip()
             error_msg = error_output if error_output else f"Command failed with exit code {e.returncode}."
-            logging.error(f"Shell command failed: {error_msg}")
+            log.error("Shell command failed: %s", error_msg)
             # self.speak(f"{self.responses.get('error_execute', 'Command failed:')} {error_msg[:100]}")
             return False
-        except subprocess.TimeoutExpired:
-            logging.error(f"Shell command timed out: {shell_action_str}")
+        except CommandCancelled:
+            # Also how the command timeout ends a slow command
+            log.info("Shell command cancelled: %s", shell_action_str)
             # self.speak(self.responses.get("error_timeout", "The command took too long to respond."))
             return False
         except Exception as e:
-            logging.error(f"Error running shell command: {e}")
+            log.error("Error running shell command: %s", e)
             # self.speak(self.responses.get("error_execute", "Error running command."))
             return False
     
     def _execute_speak_command(self, text):
         """Execute a speak command"""
-        logging.info(f"Speaking: '{text}'")
+        log.info("Speaking: '%s'", text)
         # self.speak(text)
         return True
     
-    def _get_open_command(self, app_name_key):
-        """Get the appropriate open command based on OS and config mapping"""
-        # Use lowercase for matching keys in the map
-        app_name = self.app_map.get(app_name_key.lower(), app_name_key)
-        logging.info(f"Opening app. Key='{app_name_key}', Mapped Name='{app_name}', OS='{self.current_os}'")
-        
-        try:
-            if self.current_os == "darwin":  # macOS
-                return f"open -a '{app_name}'"
-            elif self.current_os == "windows":
-                # Handle URI schemes
-                if ":" in app_name and not app_name.startswith("http"):
-                    return f'start "" "{app_name}"'
-                else:
-                    return f'start "" "{app_name}"'
-            elif self.current_os == "linux":
-                return shlex.quote(app_name)
-            else:
-                logging.warning(f"Unknown OS '{self.current_os}', using basic quote for app '{app_name}'")
-                return shlex.quote(app_name)
-        except Exception as e:
-            logging.error(f"Failed to generate open command for '{app_name_key}': {e}")
-            return None
\ No newline at end of file
@@ -0,0 +1,195 @@
+import time
+import logging
+import threading
+import multiprocessing
+from functools import partial
+from PyQt5.QtCore import QObject, Qt, pyqtSignal
+
+log = logging.getLogger("voice")
+
+# VoiceController signals relayed from the voice process to the bridge
+FORWARDED_SIGNALS = (
+    "command_received",
+    "minimize_window",
+    "close_window",
+    "show_window",
+    "started_speaking",
+    "finished_speaking",
+    "error_occurred",
+)
+
+# Requests the GUI may send to the voice process
+_CONTROLLER_CALLS = ("start_listening", "stop_listening", "speak", "stop_speaking")
+
+
+def _voice_process_main(conn, recognition_backends):
+    """Voice process entry point: run a VoiceController and relay its signals over `conn`"""
+    from Utils.log import setup_logging
+    from .voice_control import VoiceController
+    setup_logging()
+
+    send_lock = threading.Lock()
+
+    def forward(name, *args):
+        # Signals fire on the listener, TTS and executor threads
+        with send_lock:
+            try:
+                conn.send((name, args))
+            except (BrokenPipeError, OSError):
+                pass  # The GUI is gone; the request loop below sees EOF
+
+    controller = VoiceController(recognition_backends=recognition_backends)
+    for name in FORWARDED_SIGNALS:
+        # Direct: this process has no Qt event loop to queue onto
+        getattr(controller, name).connect(partial(forward, name), Qt.DirectConnection)
+
+    try:
+        while True:
+            request, args = conn.recv()
+            if request == "shutdown":
+                break
+            elif request == "delivered":
+                controller.tracer.delivered(*args)
+            elif request in _CONTROLLER_CALLS:
+                getattr(controller, request)(*args)
+            else:
+                log.warning("Unknown request from GUI: %s", request)
+    except (EOFError, OSError):
+        log.info("GUI connection closed")
+    finally:
+        controller.shutdown()
+        conn.close()
+
+
+class _RemoteTracer:
+    """Forwards the UI's delivery notifications to the tracer in the voice process"""
+
+    def __init__(self, bridge):
+        self._bridge = bridge
+
+    def delivered(self, signal):
+        self._bridge._send("delivered", signal)
+
+
+class VoiceProcessBridge(QObject):
+    """Runs VoiceController in a child process and re-emits its signals in the GUI.
+
+    Audio capture, recognition and command handling then have their own
+    interpreter and don't compete with painting for the GIL. Signals and
+    requests travel over a multiprocessing Pipe. If the voice process dies,
+    error_occurred is emitted and it is restarted up to `max_restarts`
+    times; the UI keeps running either way.
+    """
+
+    command_received = pyqtSignal(str)
+    minimize_window = pyqtSignal()
+    close_window = pyqtSignal()
+    show_window = pyqtSignal()
+    started_speaking = pyqtSignal()
+    finished_speaking = pyqtSignal()
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, recognition_backends=None, max_restarts=3, restart_delay=1.0):
+        super().__init__()
+        self.recognition_backends = recognition_backends
+        self.max_restarts = max_restarts
+        self.restart_delay = restart_delay
+        self.restarts = 0
+        self.tracer = _RemoteTracer(self)
+
+        # Spawn, not fork: the GUI process has Qt and its threads running
+        self._context = multiprocessing.get_context("spawn")
+        self._send_lock = threading.Lock()
+        self._listening = False
+        self._closing = False
+        self.process = None
+        self._conn = None
+        self._start_process()
+
+    def _start_process(self):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_voice_process_main,
+            args=(child_conn, self.recognition_backends),
+            name="voice-engine",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()  # Only the child holds its end, so its exit shows up as EOF here
+        with self._send_lock:
+            self.process = process
+            self._conn = parent_conn
+        log.info("Voice process started (pid %s)", process.pid)
+        threading.Thread(
+            target=self._read_loop,
+            args=(parent_conn, process),
+            name="voice-bridge",
+            daemon=True
+        ).start()
+
+    def _read_loop(self, conn, process):
+        """Re-emit signals from the voice process until it exits"""
+        try:
+            while True:
+                name, args = conn.recv()
+                if name in FORWARDED_SIGNALS:
+                    getattr(self, name).emit(*args)
+        except (EOFError, OSError):
+            pass
+        process.join(timeout=5)
+        conn.close()
+        if not self._closing:
+            self._on_process_died(process.exitcode)
+
+    def _on_process_died(self, exitcode):
+        log.error("Voice process exited unexpectedly (exit code %s)", exitcode)
+        self.finished_speaking.emit()  # Don't leave the face talking
+        if self.restarts >= self.max_restarts:
+            self.error_occurred.emit(f"Voice engine stopped (exit code {exitcode})")
+            return
+
+        self.restarts += 1
+        self.error_occurred.emit(f"Voice engine crashed (exit code {exitcode}), restarting")
+        time.sleep(self.restart_delay)
+        if self._closing:
+            return
+        self._start_process()
+        if self._listening:
+            self._send("start_listening")
+
+    def _send(self, request, *args):
+        with self._send_lock:
+            if self._conn is None:
+                return
+            try:
+                self._conn.send((request, args))
+            except (BrokenPipeError, OSError) as e:
+                # The reader thread reports the exit and restarts the process
+                log.warning("Voice process unavailable for '%s': %s", request, e)
+
+    def start_listening(self):
+        self._listening = True
+        self._send("start_listening")
+
+    def stop_listening(self):
+        self._listening = False
+        self._send("stop_listening")
+
+    def speak(self, text):
+        self._send("speak", text)
+
+    def stop_speaking(self):
+        self._send("stop_speaking")
+
+    def shutdown(self, timeout=5.0):
+        """Ask the voice process to shut down cleanly, terminating it if it doesn't"""
+        self._closing = True
+        self._send("shutdown")
+        process = self.process
+        if process is None:
+            return
+        process.join(timeout)
+        if process.is_alive():
+            log.warning("Voice process did not exit, terminating it")
+            process.terminate()
+            process.join(timeout)
@@ -1,20 +1,36 @@
+# Imported first so the startup profile measures from interpreter start
+from Utils.startup import profile
 import sys
+from Utils import config
+from Utils.log import setup_logging
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QApplication
 from UI.display import MainWindow
 from Voice.voice_control import VoiceController
+from Voice.voice_process import VoiceProcessBridge
 
 def main():
+    setup_logging()
+    profile.mark("imports")
     app = QApplication(sys.argv)
 
     window = MainWindow()
+    profile.mark("window created")
 
-    voice_controller = VoiceController(window)
+    # Returns immediately; TTS, recognizer and microphone initialize in the background
+    if getattr(config, 'VOICE_PROCESS', False):
+        voice_controller = VoiceProcessBridge(max_restarts=getattr(config, 'VOICE_PROCESS_RESTARTS', 3))
+    else:
+        voice_controller = VoiceController(window)
+    profile.mark("voice controller created")
 
     window.setup_voice_controller(voice_controller)
+    app.aboutToQuit.connect(voice_controller.shutdown)
 
     voice_controller.start_listening()
 
+    QTimer.singleShot(0, lambda: profile.mark("event loop running"))
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
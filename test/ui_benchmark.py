@@ -0,0 +1,264 @@
+"""Offscreen paint benchmark for MainWindow and RobotFaceWidget.
+
+Renders the border and the face into QImages on Qt's offscreen platform,
+so it runs on a headless box with no display server. Every
+resolution x animation state case reports per-frame paint time
+percentiles and Python allocation figures: the peak transient allocation
+per frame and the blocks each frame leaves allocated (from tracemalloc and
+sys.getallocatedblocks), and the blocks still held after the case. Qt's
+own C++ allocations are not visible to either.
+
+    python test/ui_benchmark.py --max-frame-ms 16
+    python test/ui_benchmark.py --save-baseline /tmp/ui_baseline.json
+    python test/ui_benchmark.py --baseline /tmp/ui_baseline.json
+
+Paint times depend on the hardware, so a baseline is only meaningful on the
+machine that recorded it: record one there before a change and pass it
+with --baseline after. The exit status is then non-zero when any case's p95
+paint time exceeds its baseline p95 by more than the tolerance and by more
+than --min-regression-ms (so sub-millisecond jitter on cheap cases doesn't
+fail the run). --max-frame-ms adds an absolute limit.
+"""
+import os
+import sys
+
+# Must be set before Qt is imported
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from PyQt5.QtWidgets import QApplication, QWidget
+from PyQt5.QtGui import QImage
+from PyQt5.QtCore import Qt, QPointF
+from Utils import config
+from Utils.tracing import RollingHistogram
+from UI.display import MainWindow
+
+RESOLUTIONS = {
+    "minimized": (config.MINIMIZED_WIDTH, config.MINIMIZED_HEIGHT),
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+}
+
+
+def face_size(resolution, width, height):
+    if resolution == "minimized":
+        return config.MINIMIZED_FACE_WIDTH, config.MINIMIZED_FACE_HEIGHT
+    return int(width * config.MAXIMIZED_FACE_SCALE_W), int(height * config.MAXIMIZED_FACE_SCALE_H)
+
+
+# Animation states: name -> function(face, frame) that puts the face in that state
+def _idle(face, frame):
+    face.is_talking = False
+    face.eyes_open = True
+    face.mouth_state = 0
+
+
+def _blink(face, frame):
+    _idle(face, frame)
+    face.eyes_open = frame % 2 == 0
+
+
+def _talking(face, frame):
+    face.is_talking = True
+    face.eyes_open = True
+    face.mouth_state = frame % 4
+
+
+def _pupils(face, frame):
+    _idle(face, frame)
+    face.pupil_offset = QPointF(random.uniform(-20, 20), random.uniform(-20, 20))
+
+
+FACE_STATES = {"idle": _idle, "blink": _blink, "talking": _talking, "pupils": _pupils}
+
+
+class Case:
+    """One benchmark case: a render function called once per frame"""
+
+    def __init__(self, name, render):
+        self.name = name
+        self.render = render
+
+    def run(self, frames, warmup, alloc_frames):
+        for frame in range(warmup):
+            self.render(frame)
+
+        # Timed without tracemalloc, which slows Python code down considerably
+        paint_ms = RollingHistogram(window=frames)
+        for frame in range(warmup, warmup + frames):
+            start = time.perf_counter()
+            self.render(frame)
+            paint_ms.add((time.perf_counter() - start) * 1000.0)
+
+        peaks = RollingHistogram(window=alloc_frames)
+        blocks = RollingHistogram(window=alloc_frames)
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        for frame in range(warmup + frames, warmup + frames + alloc_frames):
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+            base_blocks = sys.getallocatedblocks()
+            self.render(frame)
+            blocks.add(sys.getallocatedblocks() - base_blocks)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.add(peak - base)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        retained = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+        summary = paint_ms.summary()
+        return {
+            "frames": frames,
+            "paint_ms": summary,
+            "alloc_peak_bytes_p50": peaks.percentile(50),
+            "alloc_peak_bytes_max": peaks.summary()["max"],
+            "alloc_blocks_p50": blocks.percentile(50),
+            "alloc_blocks_max": blocks.summary()["max"],
+            "retained_blocks": retained,
+        }
+
+
+def build_cases(window, face_states):
+    """Resolution x state matrix of border, face and whole-window renders"""
+    face = window.face_widget
+    cases = []
+
+    for resolution, (width, height) in RESOLUTIONS.items():
+        fw, fh = face_size(resolution, width, height)
+
+        def setup(width=width, height=height, fw=fw, fh=fh):
+            window.resize(width, height)
+            face.setFixedSize(fw, fh)
+            QApplication.processEvents()  # Deliver resize events so caches are rebuilt
+
+        window_image = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+        face_image = QImage(fw, fh, QImage.Format_ARGB32_Premultiplied)
+
+        def border(frame, image=window_image, setup=setup):
+            if frame == 0:
+                setup()
+            window.gradient_angle = frame % 360
+            image.fill(Qt.transparent)
+            # Only the border strips, as the gradient timer repaints them
+            window.render(image, sourceRegion=window._border_region, flags=QWidget.DrawWindowBackground)
+
+        cases.append(Case(f"border/{resolution}", border))
+
+        for state in face_states:
+            apply_state = FACE_STATES[state]
+
+            def render_face(frame, image=face_image, setup=setup, apply_state=apply_state):
+                if frame == 0:
+                    setup()
+                apply_state(face, frame)
+                image.fill(Qt.transparent)
+                face.render(image, flags=QWidget.DrawWindowBackground)
+
+            cases.append(Case(f"face/{state}/{resolution}", render_face))
+
+        def cold_face(frame, image=face_image, setup=setup):
+            if frame == 0:
+                setup()
+            # Sprite cache dropped as on a resize (maximize/minimize)
+            face._sprites.clear()
+            face._geometry = None
+            _talking(face, frame)
+            image.fill(Qt.transparent)
+            face.render(image, flags=QWidget.DrawWindowBackground)
+
+        cases.append(Case(f"face/cold/{resolution}", cold_face))
+
+        def full_frame(frame, image=window_image, setup=setup):
+            if frame == 0:
+                setup()
+            window.gradient_angle = frame % 360
+            _talking(face, frame)
+            image.fill(Qt.transparent)
+            window.render(image)
+
+        cases.append(Case(f"window/{resolution}", full_frame))
+
+    return cases
+
+
+def compare(results, baseline, tolerance, max_frame_ms, min_regression_ms=0.0):
+    failures = []
+    for name, result in results.items():
+        p95 = result["paint_ms"]["p95"]
+        if max_frame_ms is not None and p95 > max_frame_ms:
+            failures.append(f"{name}: p95 {p95:.2f}ms > {max_frame_ms}ms")
+        reference = baseline.get(name) if baseline else None
+        if reference is not None:
+            reference_p95 = reference["paint_ms"]["p95"]
+            limit = max(reference_p95 * (1.0 + tolerance), reference_p95 + min_regression_ms)
+            if p95 > limit:
+                failures.append(f"{name}: p95 {p95:.2f}ms > baseline {reference['paint_ms']['p95']:.2f}ms +{tolerance:.0%}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offscreen paint benchmark for the UI widgets")
+    parser.add_argument("--frames", type=int, default=120, help="measured frames per case")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured frames per case")
+    parser.add_argument("--alloc-frames", type=int, default=30, help="frames per case traced for allocations")
+    parser.add_argument("--cases", help="only run cases whose name contains this")
+    parser.add_argument("--states", default=",".join(FACE_STATES), help="comma separated face states")
+    parser.add_argument("--output", help="write the full JSON results here")
+    parser.add_argument("--save-baseline", help="write results as a baseline for later runs")
+    parser.add_argument("--baseline", help="fail on p95 regressions against this baseline, recorded on this machine")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 regression over baseline")
+    parser.add_argument("--min-regression-ms", type=float, default=0.5,
+                        help="allowed absolute p95 regression over baseline")
+    parser.add_argument("--max-frame-ms", type=float, help="fail if any case's p95 exceeds this")
+    args = parser.parse_args(argv)
+
+    random.seed(0)
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = MainWindow()
+    window.show()  # paintEvent skips hidden windows
+    # Frames are driven by the benchmark, not the animation clock
+    window.animation_clock.remove(window._update_gradient)
+    window.animation_clock.remove(window.face_widget._on_frame)
+
+    cases = build_cases(window, [state for state in args.states.split(",") if state])
+    if args.cases:
+        cases = [case for case in cases if args.cases in case.name]
+
+    results = {}
+    print(f"Qt platform: {app.platformName()}")
+    for case in cases:
+        result = results[case.name] = case.run(args.frames, args.warmup, args.alloc_frames)
+        paint = result["paint_ms"]
+        print(f"{case.name:<24} p50={paint['p50']:.2f}ms p95={paint['p95']:.2f}ms max={paint['max']:.2f}ms "
+              f"alloc_peak={result['alloc_peak_bytes_p50']}B alloc_blocks={result['alloc_blocks_p50']} "
+              f"retained={result['retained_blocks']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        missing = sorted(set(results) - set(baseline))
+        if missing:
+            print(f"No baseline for: {', '.join(missing)}")
+    failures = compare(results, baseline, args.tolerance, args.max_frame_ms, args.min_regression_ms)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+
+    window.hide()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""Regenerates the WAV clips of the replay regression corpus.
+
+The replay harness takes its transcripts from manifest.jsonl, so the
+clips only have to pass the recognizer's phrase endpointing and differ
+from each other: each is silence, a tone burst at its own pitch, and
+trailing silence longer than the pause threshold.
+
+    python test/voice_corpus/make_corpus.py
+    python -m Voice.replay test/voice_corpus/manifest.jsonl --min-accuracy 1.0
+"""
+import os
+import json
+import math
+import wave
+import struct
+
+SAMPLE_RATE = 8000
+AMPLITUDE = 8000  # Well above speech_recognition's default energy threshold of 300
+LEAD_SECONDS = 0.2
+TRAIL_SECONDS = 1.0  # pause_threshold is 0.8s
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def write_clip(path, frequency, seconds):
+    samples = [0] * int(LEAD_SECONDS * SAMPLE_RATE)
+    samples += [
+        int(AMPLITUDE * math.sin(2 * math.pi * frequency * i / SAMPLE_RATE))
+        for i in range(int(seconds * SAMPLE_RATE))
+    ]
+    samples += [0] * int(TRAIL_SECONDS * SAMPLE_RATE)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+
+
+def main():
+    manifest = os.path.join(HERE, "manifest.jsonl")
+    with open(manifest) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    for index, entry in enumerate(entries):
+        path = os.path.join(HERE, entry["wav"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Longer phrases get longer bursts; the pitch keeps every clip's bytes distinct
+        seconds = 0.3 + 0.05 * len(entry.get("transcript", "").split())
+        write_clip(path, 220 + 40 * index, seconds)
+        print(f"Wrote {entry['wav']}")
+
+
+if __name__ == "__main__":
+    main()